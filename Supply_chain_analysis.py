@@ -1,13 +1,16 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
 import altair as alt
 import logging
-from google.cloud import bigquery
-from google.oauth2 import service_account
 import subprocess
 import datetime
+from kpi_engine import KPIAccumulator, compute_kpis
+from query_backend import backend_name
+from dashboard_pipeline import CHART_QUERIES, MONTHLY_ROLLUP_QUERY, build_fetch_query, clean_data
+from dashboard_app import (current_session_id, get_bigquery_client, get_figure_cache, get_forecast_service,
+                           get_frame_store, get_kpi_engine, get_product_index, get_scheduler, overlay_forecasts,
+                           refresh_product_index, run_shared_query, show_kpis, stream_shared_query)
 
 def load_css():
     with open("style.css") as f:
@@ -17,14 +20,23 @@ load_css()
 # logging
 logging.basicConfig(filename="app.log", level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-#Google Cloud credentials
+#Google Cloud credentials (not needed when SUPPLY_CHAIN_BACKEND=duckdb runs on the bundled workbook)
+if backend_name() == "bigquery":
+    try:
+        get_bigquery_client()
+    except Exception as e:
+        st.error("Failed to initialize BigQuery client.")
+        logging.error(f"BigQuery client initialization failed: {e}")
+
+
+# Query results are shared read-only across sessions; in-place cleaning copies on write
+pd.set_option("mode.copy_on_write", True)
+session_id = current_session_id()
+
 try:
-    credentials = service_account.Credentials.from_service_account_file("Own Credentials")
-    client = bigquery.Client(credentials=credentials)
+    refresh_product_index()
 except Exception as e:
-    st.error("Failed to initialize BigQuery client.")
-    logging.error(f"BigQuery client initialization failed: {e}")
-
+    logging.error(f"Product search index refresh failed: {e}")
 
 st.title("📊 Supply Chain Data Analysis with BigQuery")
 
@@ -36,12 +48,38 @@ if st.sidebar.button("🔄🤵 Change User"):
 #filters
 st.sidebar.header("🔍 Search & Filter")
 search_text = st.sidebar.text_input("🔎 Search by Product Name:")
+product_ids = None
+product_index = get_product_index()
+# An empty index means the refresh failed; the query then falls back to LIKE
+if search_text and len(product_index):
+    suggestions = product_index.suggest(search_text)
+    selected_product = st.sidebar.selectbox("Matching products:", ["All matches"] + suggestions)
+    if selected_product == "All matches":
+        product_ids = product_index.product_ids(search_text)
+    else:
+        product_ids = product_index.product_ids(names=[selected_product])
 selected_category = st.sidebar.selectbox("📂 Select Category:", ["All","Furniture","Office Supplies","Technology"])
 selected_segment = st.sidebar.selectbox("👥 Select Segment:", ["All","Consumer","Corporate","Home Office"])
 start_date = datetime.date(2011, 1, 1)
 end_date = datetime.date(2014, 12, 31)
 date_range = st.sidebar.date_input("📅 Select Date Range:", [start_date, end_date], min_value=start_date, max_value=end_date)
 
+with st.sidebar.expander("🧠 Memory Usage"):
+    frame_store = get_frame_store()
+    session_usage = frame_store.session_usage(session_id)
+    st.write(f"Shared frames: {frame_store.total_bytes() / 1024 ** 2:,.1f} MB of {frame_store.budget_bytes / 1024 ** 2:,.0f} MB")
+    st.write(f"This session: {session_usage['shared_bytes'] / 1024 ** 2:,.1f} MB shared, {session_usage['private_bytes'] / 1024 ** 2:,.1f} MB private")
+    # Other sessions appear only in the total, never by id
+    st.dataframe(frame_store.usage(session_id))
+
+# A click stops the running fetch's script run, which cancels its query job on the way out
+if st.sidebar.button("⏹️ Cancel Fetch"):
+    interrupted_rows = st.session_state.pop("interrupted_fetch_rows", None)
+    if interrupted_rows is None:
+        st.sidebar.info("No fetch was running.")
+    else:
+        st.sidebar.info(f"Fetch cancelled after {interrupted_rows:,} rows.")
+
 # Sorting options
 st.sidebar.header("🔄 Sorting Options")
 sort_column = st.sidebar.selectbox("Sort by:", ["Sales", "Profit", "Order_Date"])
@@ -55,7 +93,8 @@ if st.sidebar.button("⚙️ Advanced Analysis"):
 
 
 #fetch data from BigQuery
-def fetch_data_from_bigquery(product_name=None, category=None, segment=None, date_range=None):
+def fetch_data_from_bigquery(product_name=None, category=None, segment=None, date_range=None, product_ids=None,
+                             on_page=None):
     try:
         if product_name and not isinstance(product_name, str):
             raise ValueError("Product name must be a string.")
@@ -69,23 +108,15 @@ def fetch_data_from_bigquery(product_name=None, category=None, segment=None, dat
         if date_range and (not isinstance(date_range, (list, tuple)) or len(date_range) != 2):
             raise ValueError("Date range must be a list or tuple of two dates.")
 
-        query = "SELECT * FROM macro-aurora-434314-h7.Supplychainanalysis.Cleaneddata WHERE 1=1"
-
-        if product_name:
-            query += f" AND LOWER(Product_Name) LIKE '%{product_name.lower()}%'"
-
-        if category and category != "All":
-            query += f" AND LOWER(Category) = '{category.lower()}'"
-
-        if segment and segment != "All":
-            query += f" AND LOWER(Segment) = '{segment.lower()}'"
+        if product_ids is not None and not product_ids:
+            return pd.DataFrame()
 
-        if date_range:
-            query += f" AND Order_Date BETWEEN '{date_range[0]}' AND '{date_range[1]}'"
-        
-        query += f" ORDER BY {sort_column} {'ASC' if sort_order == 'Ascending' else 'DESC'}"
-        
-        df = client.query(query).to_dataframe()
+        query, query_parameters, key = build_fetch_query(
+            product_name, category, segment, date_range, product_ids, sort_column, sort_order
+        )
+        if on_page is not None:
+            return stream_shared_query(query, query_parameters, key, on_page)
+        df = run_shared_query(query, query_parameters, key=key)
         return df
     except ValueError as ve:
         logging.error(f"Invalid input error: {ve}")
@@ -95,164 +126,147 @@ def fetch_data_from_bigquery(product_name=None, category=None, segment=None, dat
         return pd.DataFrame()
 
 
+if session_id:
+    with st.sidebar.expander("⏱️ Background Jobs"):
+        st.dataframe(get_scheduler((start_date, end_date)).status())
+
+
 #display data
 if st.button("Fetch Data from BigQuery"):
-    df = fetch_data_from_bigquery(search_text, selected_category, selected_segment, date_range)
+    st.session_state.pop("interrupted_fetch_rows", None)
+    # Placeholders keep the page layout while rows stream in
+    progress_slot = st.empty()
+    preview_slot = st.empty()
+    kpi_slot = st.empty()
+
+    # Product search, and slices with NULL Sales/Profit, can't be answered from the cells,
+    # so they fall back to the fetched rows
+    kpis = None
+    if not search_text:
+        try:
+            kpis = get_kpi_engine().metrics(date_range, selected_category, selected_segment)
+            if kpis is not None:
+                show_kpis(kpi_slot, kpis)
+        except Exception as e:
+            logging.warning(f"KPI engine unavailable, computing from fetched rows: {e}")
+
+    accumulator = KPIAccumulator()
+
+    def show_page(page, stream):
+        if page is None:
+            progress_slot.progress(0.0, text="⏳ Running query…")
+            return
+        accumulator.add(page)
+        if accumulator.rows == len(page):
+            with preview_slot.container():
+                st.subheader("🧹 Data Preview (first rows)")
+                st.dataframe(page.head(1000))
+        total_rows = stream.total_rows
+        progress_text = f"⏳ Fetched {accumulator.rows:,}{f' of {total_rows:,}' if total_rows else ''} rows"
+        if kpis is None:
+            progress_text += " — key metrics are running totals until the fetch completes"
+            show_kpis(kpi_slot, accumulator.kpis())
+        progress_slot.progress(min(accumulator.rows / total_rows, 1.0) if total_rows else 0.0, text=progress_text)
+
+    df = fetch_data_from_bigquery(search_text, selected_category, selected_segment, date_range, product_ids,
+                                  on_page=show_page)
     
     if df.empty:
+        progress_slot.empty()
+        preview_slot.empty()
+        kpi_slot.empty()
         st.warning("⚠ No data found for the given filters.")
     else:
         try:
-            df["Order_Date"] = pd.to_datetime(df["Order_Date"], errors="coerce")
-            df["Ship_Date"] = pd.to_datetime(df["Ship_Date"], errors="coerce")
-
-            df.fillna({
-                "Discount": df["Discount"].median(),
-                "Profit": df["Profit"].median(),
-                "Sales": df["Sales"].median(),
-                "Shipping_Cost": df["Shipping_Cost"].median()
-            }, inplace=True)
-
-            df.drop_duplicates(inplace=True)
-            df["Lead_Time"] = (df["Ship_Date"] - df["Order_Date"]).dt.days.fillna(0)
-            df["Inventory_Turnover"] = df["Sales"] / (df["Shipping_Cost"] + 1)
-            
-            df["Category"] = df["Category"].str.lower()
-            df["Sub_Category"] = df["Sub_Category"].str.lower()
-            df["Segment"] = df["Segment"].str.lower()
-            
-            st.success("✅ Data Cleaning Complete!")
-            st.subheader("🧹 Cleaned Data Preview")
-            st.dataframe(df)
+            df = clean_data(df)
 
-            
-            total_sales = df["Sales"].sum()
-            total_cities = df["City"].nunique()
-            profit_percentage = (df["Profit"].sum() / df["Sales"].sum()) * 100 if df["Sales"].sum() > 0 else 0
-            sales_rate = df["Sales"].sum() / df["Order_ID"].nunique() if df["Order_ID"].nunique() > 0 else 0
+            get_frame_store().track(session_id, "df", df)
 
-            # Display key metrics
-            st.subheader("📊 Key Metrics")
-            col1, col2, col3, col4 = st.columns(4)
-            col1.metric("💰 Total Sales", f"${total_sales:,.2f}")
-            col2.metric("🏙️ Total Cities", f"{total_cities}")
-            col3.metric("📈 Profit Percentage", f"{profit_percentage:.2f}%")
-            col4.metric("⚡ Sales Rate", f"${sales_rate:,.2f} per order")
+            progress_slot.success("✅ Data Cleaning Complete!")
+            with preview_slot.container():
+                st.subheader("🧹 Cleaned Data Preview")
+                st.dataframe(df)
+
+            if kpis is None:
+                kpis = compute_kpis(df)
+            show_kpis(kpi_slot, kpis)
 
 
             
+            # Refits are scheduled only when the monthly rollup changed (e.g. a new month arrived)
+            try:
+                get_forecast_service().update(run_shared_query(MONTHLY_ROLLUP_QUERY))
+            except Exception as e:
+                logging.warning(f"Forecast refresh skipped: {e}")
+
             # 📈 MOnthly Order Trend
-            query = """
-                SELECT 
-                    EXTRACT(YEAR FROM Order_Date) AS Year, 
-                    FORMAT_DATE('%Y-%m', Order_Date) AS Month, 
-                    COUNT(DISTINCT Order_ID) AS Order_Count
-                FROM `macro-aurora-434314-h7.Supplychainanalysis.Cleaneddata`
-                GROUP BY Year, Month
-                ORDER BY Year, Month;
-            """
-            df1 = client.query(query).to_dataframe()
+            df1 = run_shared_query(CHART_QUERIES["monthly_orders"])
             st.subheader("📊 Monthly Order Trend Data")
             st.dataframe(df1)
             st.subheader("📈 Monthly Order Trend")
-            fig = px.line(df1, x="Month", y="Order_Count", markers=True, title="Monthly Order Trend")
+            fig = get_figure_cache().get("monthly_orders", df1)
+            fig = overlay_forecasts(fig, "Order_Count", selected_category, selected_segment)
             st.plotly_chart(fig)
             st.write("This line chart represents the number of unique orders placed each month, helping to identify seasonal trends and peak sales periods.")
 
 
             # 📊 Monthly Sales Trend
-            query = """
-                SELECT 
-                    FORMAT_DATE('%Y-%m', Order_Date) AS Order_Month, 
-                    SUM(Sales) AS Total_Sales
-                FROM `macro-aurora-434314-h7.Supplychainanalysis.Cleaneddata`
-                GROUP BY Order_Month
-                ORDER BY Order_Month;
-            """
-            df_sales = client.query(query).to_dataframe()
+            df_sales = run_shared_query(CHART_QUERIES["monthly_sales"])
             st.subheader("📊 Monthly Sales Data")
             st.dataframe(df_sales)
             st.subheader("📈 Monthly Sales Trend")
-            fig = px.line(df_sales, x="Order_Month", y="Total_Sales", markers=True, title="Monthly Sales Trend")
+            fig = get_figure_cache().get("monthly_sales", df_sales)
+            fig = overlay_forecasts(fig, "Total_Sales", selected_category, selected_segment)
             st.plotly_chart(fig)
             st.write("This graph showcases total monthly sales, revealing revenue trends over time and indicating periods of high or low sales performance.")
 
 
             # ⏳ Lead Time Distribution
-            query = """
-                SELECT Lead_Time
-                FROM `macro-aurora-434314-h7.Supplychainanalysis.Cleaneddata`
-                WHERE Lead_Time IS NOT NULL;
-            """
-            df_lead_time = client.query(query).to_dataframe()
+            df_lead_time = run_shared_query(CHART_QUERIES["lead_time"])
             st.subheader("⏳ Lead Time Data")
             st.dataframe(df_lead_time)
             st.subheader("⏳ Lead Time Distribution")
-            fig = px.histogram(df_lead_time, x="Lead_Time", nbins=30, title="Lead Time Distribution", color_discrete_sequence=["#636EFA"])
+            fig = get_figure_cache().get("lead_time", df_lead_time)
             st.plotly_chart(fig)
             st.write("The histogram represents the distribution of lead times for orders, helping to assess delivery efficiency and potential delays.")
 
 
             # 💰 Sales vs. Profit Scatter Plot
-            query = """
-                SELECT Sales, Profit, Category, Product_Name
-                FROM `macro-aurora-434314-h7.Supplychainanalysis.Cleaneddata`
-                WHERE Sales IS NOT NULL AND Profit IS NOT NULL;
-            """
-            df_sales_profit = client.query(query).to_dataframe()
+            df_sales_profit = run_shared_query(CHART_QUERIES["sales_profit"])
             st.subheader("💰 Sales vs. Profit Data")
             st.dataframe(df_sales_profit)
             st.subheader("💰 Sales vs. Profit Analysis")
-            fig = px.scatter(df_sales_profit, x="Sales",y="Profit", color="Category", title="Sales vs. Profit", hover_data=["Product_Name"])
+            fig = get_figure_cache().get("sales_profit", df_sales_profit)
             st.plotly_chart(fig)
             st.write("This scatter plot visualizes the relationship between sales and profit across different product categories, helping to identify high-profit and low-profit products.")
 
 
             # 📊 Category-wise Sales Performance
-            query = """
-                SELECT Category, SUM(Sales) AS Total_Sales
-                FROM `macro-aurora-434314-h7.Supplychainanalysis.Cleaneddata`
-                WHERE Sales IS NOT NULL
-                GROUP BY Category
-                ORDER BY Total_Sales DESC;
-            """
-            df_category_sales = client.query(query).to_dataframe()
+            df_category_sales = run_shared_query(CHART_QUERIES["category_sales"])
             st.subheader("📊 Category-wise Sales Data")
             st.dataframe(df_category_sales)
             st.subheader("📊 Category-wise Sales Performance")
-            fig = px.pie(df_category_sales, names="Category", values="Total_Sales", title="Sales by Category", color_discrete_sequence=px.colors.qualitative.Pastel)
+            fig = get_figure_cache().get("category_sales", df_category_sales)
             st.plotly_chart(fig)
             st.write("This pie chart breaks down total sales by product category, allowing easy identification of the most and least revenue-generating categories.")
 
 
             # 📎 Inventory Turnover Distribution
-            query = """
-                SELECT Inventory_Turnover
-                FROM `macro-aurora-434314-h7.Supplychainanalysis.Cleaneddata`
-                WHERE Inventory_Turnover IS NOT NULL;
-            """
-            df_inventory_turnover = client.query(query).to_dataframe()
+            df_inventory_turnover = run_shared_query(CHART_QUERIES["inventory_turnover"])
             st.subheader("📎 Inventory Turnover Data")
             st.dataframe(df_inventory_turnover)
             st.subheader("📎 Inventory Turnover Distribution")
-            fig = px.histogram(df_inventory_turnover, x="Inventory_Turnover", nbins=30, title="Inventory Turnover Distribution", color_discrete_sequence=["#EF553B"])
+            fig = get_figure_cache().get("inventory_turnover", df_inventory_turnover)
             st.plotly_chart(fig)
             st.write("This histogram shows the distribution of inventory turnover rates, which helps evaluate how efficiently inventory is managed.")
 
 
             # 📊 Segment-wise Sales Performance
-            query = """
-                SELECT Segment, SUM(Sales) AS Total_Sales
-                FROM `macro-aurora-434314-h7.Supplychainanalysis.Cleaneddata`
-                WHERE Sales IS NOT NULL
-                GROUP BY Segment
-                ORDER BY Total_Sales DESC;
-            """
-            df_segment_sales = client.query(query).to_dataframe()
+            df_segment_sales = run_shared_query(CHART_QUERIES["segment_sales"])
             st.subheader("📊 Segment-wise Sales Data")
             st.dataframe(df_segment_sales)
             st.subheader("📊 Segment-wise Sales Performance")
-            fig = px.bar(df_segment_sales, x="Segment", y="Total_Sales", title="Sales by Segment", color="Segment", color_discrete_sequence=px.colors.qualitative.Set3)
+            fig = get_figure_cache().get("segment_sales", df_segment_sales)
             st.plotly_chart(fig)
             st.write("This bar chart displays total sales by customer segment, helping to understand which segments contribute the most revenue.")
 
@@ -2,6 +2,7 @@ import streamlit as st
 from google.cloud import bigquery
 import pandas as pd
 import os
+from dml_guard import ALL_PARTITIONS, ChangeLog, build_dml, preview_dml
 
 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = r"own Credentials"
 
@@ -15,6 +16,7 @@ def execute_dml(query, params=None):
     query_job = client.query(query, job_config=job_config)
     query_job.result()
     st.success("Query executed successfully!")
+    return query_job
 
 # Function to fetch data
 def fetch_data(query):
@@ -50,32 +52,41 @@ if user_role == "Admin":
     if operation == "Insert":
         columns = st.sidebar.text_input("Columns (comma-separated)")
         values = st.sidebar.text_input("Values (comma-separated)")
-        if st.sidebar.button("Execute Insert"):
-            query = f"""
-                INSERT INTO `{table_name}` ({columns})
-                VALUES ({values})
-            """
-            execute_dml(query)
+        dml = {"columns": columns, "values": values}
 
     elif operation == "Update":
         set_clause = st.sidebar.text_input("SET clause (e.g., column='value')")
         condition = st.sidebar.text_input("WHERE condition")
-        if st.sidebar.button("Execute Update"):
-            query = f"""
-                UPDATE `{table_name}`
-                SET {set_clause}
-                WHERE {condition}
-            """
-            execute_dml(query)
+        dml = {"set_clause": set_clause, "condition": condition}
 
     elif operation == "Delete":
         condition = st.sidebar.text_input("WHERE condition")
-        if st.sidebar.button("Execute Delete"):
-            query = f"""
-                DELETE FROM `{table_name}`
-                WHERE {condition}
-            """
-            execute_dml(query)
+        dml = {"condition": condition}
+
+    # Statements are dry-run and counted first; only a previewed, unblocked statement can be executed
+    if st.sidebar.button(f"Preview {operation}"):
+        try:
+            st.session_state.dml_preview = preview_dml(client, operation, table_name, **dml)
+        except Exception as e:
+            st.session_state.pop("dml_preview", None)
+            st.sidebar.error(f"Preview failed: {e}")
+
+    preview = st.session_state.get("dml_preview")
+    # A preview only stands for the exact statement it checked
+    if preview and preview["sql"] == build_dml(operation, table_name, **dml):
+        st.sidebar.write(f"Bytes to process: {preview['bytes_processed'] / 1024 ** 2:,.1f} MB")
+        st.sidebar.write(f"Rows affected: {preview['affected_rows']:,}")
+        if ALL_PARTITIONS in preview["partitions"]:
+            st.sidebar.write("Months affected: all (the changed rows' months can't be pinned down)")
+        elif preview["partitions"]:
+            st.sidebar.write(f"Months affected: {', '.join(preview['partitions'])}")
+        if preview["blocked"]:
+            for reason in preview["blocked"]:
+                st.sidebar.error(f"⛔ {reason}")
+        elif st.sidebar.button(f"Confirm {operation}"):
+            query_job = execute_dml(preview["sql"])
+            ChangeLog().record(table_name, operation, preview["partitions"], query_job.num_dml_affected_rows, user_email)
+            del st.session_state.dml_preview
 
 # General User & Admin can view data
 st.subheader("Data Visualization")
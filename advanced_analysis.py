@@ -3,6 +3,9 @@ import pandas as pd
 import plotly.express as px
 import logging
 
+from column_profiler import profile_executor, profile_frame, summary_table
+from dashboard_pipeline import binned_histogram
+
 # Configure logging
 logging.basicConfig(filename="liveapp.log", level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
@@ -24,35 +27,51 @@ st.title("📊 Supply Chain Data Analysis")
 # File upload
 uploaded_file = st.file_uploader("Upload Excel or CSV File", type=["csv", "xlsx"])
 
+# Worker processes for column profiling, shared by every session (None on single-core hosts)
+@st.cache_resource
+def get_profile_executor():
+    return profile_executor()
+
+# Parses an upload and profiles every column once; reruns and widget changes reuse the result
+@st.cache_resource(max_entries=4)
+def load_upload(file_id, file_name, _uploaded_file):
+    # Read file (CSV or Excel)
+    file_extension = file_name.split(".")[-1]
+    if file_extension == "csv":
+        raw_df = pd.read_csv(_uploaded_file, low_memory=False)
+    else:
+        raw_df = pd.read_excel(_uploaded_file)
+
+    # Converted columns replace those of a shallow copy, so the preview keeps the file as read
+    df = raw_df.copy(deep=False)
+
+    # Identify datetime columns and convert
+    for col in df.select_dtypes(include=["object"]).columns:
+        try:
+            df[col] = pd.to_datetime(df[col], format="%Y-%m-%d", errors='coerce')
+        except Exception:
+            logging.warning(f"Skipping datetime conversion for column: {col}")
+
+    # Convert all object columns to string (fix PyArrow error)
+    for col in df.select_dtypes(include=["object"]).columns:
+        df[col] = df[col].astype(str)
+
+    profiles = profile_frame(df, executor=get_profile_executor())
+    return raw_df, df, profiles
+
 if uploaded_file:
     try:
-        # Read file (CSV or Excel)
-        file_extension = uploaded_file.name.split(".")[-1]
-        if file_extension == "csv":
-            df = pd.read_csv(uploaded_file, low_memory=False)
-        else:
-            df = pd.read_excel(uploaded_file)
+        raw_df, df, profiles = load_upload(uploaded_file.file_id, uploaded_file.name, uploaded_file)
 
         logging.info(f"File '{uploaded_file.name}' uploaded and read successfully.")
 
         # Show dataset preview
         st.subheader("🔍 Cleaned Dataset Preview")
-        st.write(df)
-
-        # Identify datetime columns and convert
-        for col in df.select_dtypes(include=["object"]).columns:
-            try:
-                df[col] = pd.to_datetime(df[col], format="%Y-%m-%d", errors='coerce')
-            except Exception:
-                logging.warning(f"Skipping datetime conversion for column: {col}")
-
-        # Convert all object columns to string (fix PyArrow error)
-        for col in df.select_dtypes(include=["object"]).columns:
-            df[col] = df[col].astype(str)
+        st.write(raw_df)
 
         # Show dataset summary
         st.subheader("📊 Dataset Summary")
-        st.write(df.describe())
+        st.write(summary_table(profiles))
 
         # Column selection for analysis
         numeric_cols = df.select_dtypes(include=["int64", "float64"]).columns.tolist()
@@ -63,8 +82,9 @@ if uploaded_file:
             st.subheader("📈 Numeric Data Visualization")
             selected_num_col = st.selectbox("Select Numeric Column", numeric_cols)
 
-            if selected_num_col:
-                fig1 = px.histogram(df, x=selected_num_col, title=f"Distribution of {selected_num_col}", nbins=30)
+            if selected_num_col and profiles[selected_num_col]["histogram"] is not None:
+                fig1 = binned_histogram(profiles[selected_num_col]["histogram"], selected_num_col,
+                                        f"Distribution of {selected_num_col}", None)
                 st.plotly_chart(fig1, use_container_width=True)
                 logging.info(f"Histogram plotted for {selected_num_col}")
 
@@ -74,11 +94,16 @@ if uploaded_file:
             selected_cat_col = st.selectbox("Select Categorical Column", categorical_cols)
 
             if selected_cat_col:
-                category_counts = df[selected_cat_col].value_counts().reset_index()
-                category_counts.columns = [selected_cat_col, 'count']
+                profile = profiles[selected_cat_col]
+                category_counts = profile["top"]
 
                 fig2 = px.bar(category_counts, x=selected_cat_col, y="count", title=f"Category Distribution: {selected_cat_col}")
                 st.plotly_chart(fig2, use_container_width=True)
+                if profile["distinct"] > len(category_counts):
+                    st.caption(
+                        f"Top {len(category_counts)} of {'' if profile['distinct_exact'] else '~'}{profile['distinct']:,} values"
+                        + ("" if profile["top_exact"] else " (approximate counts)")
+                    )
                 logging.info(f"Bar chart plotted for {selected_cat_col}")
 
         # Final message
@@ -0,0 +1,202 @@
+import hashlib
+import hmac
+import logging
+import sqlite3
+import threading
+import time
+
+# Hash compared against when a Mail_ID is unknown, so a miss costs the same as a wrong password
+_DUMMY_HASH = hashlib.sha256(b"").hexdigest()
+
+
+def hash_password(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def verify_password(stored_hashed_password, password):
+    return hmac.compare_digest(stored_hashed_password or _DUMMY_HASH, hash_password(password))
+
+
+# UserTable in BigQuery
+class BigQueryUserStore:
+    def __init__(self, client, table_id):
+        self.client = client
+        self.table_id = table_id
+
+    def load_users(self):
+        query = f"SELECT User_Name, Mail_ID, Password FROM `{self.table_id}`"
+        result = self.client.query(query).result().to_dataframe()
+        return {row.Mail_ID: (row.User_Name, row.Password) for row in result.itertuples(index=False)}
+
+    # DML insert rather than insert_rows_json: streamed rows sit in the streaming buffer, where admin
+    # UPDATE/DELETE cannot touch them for up to ~90 minutes. Mail_IDs already in the table are skipped,
+    # so retrying a batch whose outcome was unknown does not duplicate it. Returns (failed, duplicates)
+    # row indexes, checked against what the table holds afterwards.
+    def insert_users(self, rows):
+        from google.cloud import bigquery
+
+        query = f"""
+            INSERT INTO `{self.table_id}` (User_Name, Mail_ID, Password)
+            SELECT incoming.User_Name, incoming.Mail_ID, incoming.Password FROM UNNEST(@rows) AS incoming
+            WHERE NOT EXISTS (SELECT 1 FROM `{self.table_id}` AS existing WHERE existing.Mail_ID = incoming.Mail_ID)
+        """
+        rows_param = bigquery.ArrayQueryParameter("rows", "STRUCT", [
+            bigquery.StructQueryParameter(
+                None,
+                bigquery.ScalarQueryParameter("User_Name", "STRING", row["User_Name"]),
+                bigquery.ScalarQueryParameter("Mail_ID", "STRING", row["Mail_ID"]),
+                bigquery.ScalarQueryParameter("Password", "STRING", row["Password"])
+            )
+            for row in rows
+        ])
+        read_back = f"SELECT Mail_ID, Password FROM `{self.table_id}` WHERE Mail_ID IN UNNEST(@mail_ids)"
+        mail_ids = bigquery.ArrayQueryParameter("mail_ids", "STRING", [row["Mail_ID"] for row in rows])
+        try:
+            self.client.query(query, job_config=bigquery.QueryJobConfig(query_parameters=[rows_param])).result()
+            stored = self.client.query(read_back, job_config=bigquery.QueryJobConfig(query_parameters=[mail_ids])).result()
+        except Exception as e:
+            logging.error(f"UserTable insert of {len(rows)} rows failed: {e}")
+            return list(range(len(rows))), []
+        return _insert_outcome(rows, [(row["Mail_ID"], row["Password"]) for row in stored])
+
+
+# A row counts as written only when its Mail_ID maps to its own hash alone; a Mail_ID held by another
+# password is a duplicate (never confirmed, so it can't take over the account), and a missing one failed
+def _insert_outcome(rows, stored):
+    hashes = {}
+    for mail, password in stored:
+        hashes.setdefault(mail, set()).add(password)
+    failed = []
+    duplicates = []
+    for index, row in enumerate(rows):
+        found = hashes.get(row["Mail_ID"])
+        if not found:
+            failed.append(index)
+        elif found != {row["Password"]}:
+            duplicates.append(index)
+            logging.warning(f"UserTable already holds {row['Mail_ID']}; sign-up not written.")
+    return failed, duplicates
+
+
+# Local SQLite stand-in for UserTable (tests and offline runs)
+class SQLiteUserStore:
+    def __init__(self, path=":memory:"):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS UserTable (User_Name TEXT, Mail_ID TEXT, Password TEXT)"
+            )
+            self.conn.commit()
+
+    def load_users(self):
+        with self.lock:
+            rows = self.conn.execute("SELECT User_Name, Mail_ID, Password FROM UserTable").fetchall()
+        return {mail: (user_name, password) for user_name, mail, password in rows}
+
+    # Same dedupe and outcome as BigQueryUserStore.insert_users
+    def insert_users(self, rows):
+        with self.lock:
+            self.conn.executemany(
+                "INSERT INTO UserTable (User_Name, Mail_ID, Password) SELECT :User_Name, :Mail_ID, :Password "
+                "WHERE NOT EXISTS (SELECT 1 FROM UserTable WHERE Mail_ID = :Mail_ID)",
+                rows
+            )
+            self.conn.commit()
+            mail_ids = [row["Mail_ID"] for row in rows]
+            stored = self.conn.execute(
+                f"SELECT Mail_ID, Password FROM UserTable WHERE Mail_ID IN ({', '.join('?' * len(mail_ids))})",
+                mail_ids
+            ).fetchall()
+        return _insert_outcome(rows, stored)
+
+
+# In-memory Mail_ID -> (User_Name, Password hash) index over a user store.
+# Only the first load and loads after an invalidation block; later reloads run in one background thread
+# while lookups keep reading the previous index, so a miss never waits on the store.
+# changed() is polled on each lookup and returns True when the store was modified elsewhere (admin DML).
+class CredentialCache:
+    def __init__(self, store, ttl=300, miss_refresh_interval=30, changed=None):
+        self.store = store
+        self.ttl = ttl
+        self.miss_refresh_interval = miss_refresh_interval
+        self.changed = changed
+        self.users = {}
+        self.loaded_at = None
+        self.invalidated_at = None
+        self.refreshing = False
+        # Rows written by this process with the time they were added
+        self.added = {}
+        self.lock = threading.Lock()
+        self.load_lock = threading.RLock()
+
+    # The next lookup reloads before answering, so changed or deleted credentials stop working at once
+    def invalidate(self):
+        with self.lock:
+            self.invalidated_at = time.monotonic()
+
+    def refresh(self):
+        with self.load_lock:
+            started = time.monotonic()
+            users = self.store.load_users()
+            with self.lock:
+                # Rows added while the load ran may be missing from it, so they are carried over
+                self.added = {mail: entry for mail, entry in self.added.items() if entry[1] >= started}
+                self.users = {**users, **{mail: user for mail, (user, _) in self.added.items()}}
+                self.loaded_at = time.monotonic()
+                # A load that started before the invalidation may still hold the old credentials
+                if self.invalidated_at is not None and self.invalidated_at < started:
+                    self.invalidated_at = None
+        logging.info(f"Credential cache refreshed with {len(self.users)} users.")
+
+    # Starts a reload unless one is already running
+    def refresh_async(self):
+        with self.lock:
+            if self.refreshing:
+                return
+            self.refreshing = True
+        threading.Thread(target=self._background_refresh, name="credential-refresh", daemon=True).start()
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logging.error(f"Credential cache refresh failed: {e}")
+        finally:
+            with self.lock:
+                self.refreshing = False
+
+    # Rows this process just wrote, visible at once instead of after the next reload
+    def add_users(self, rows):
+        now = time.monotonic()
+        added = {row["Mail_ID"]: (row["User_Name"], row["Password"]) for row in rows}
+        with self.lock:
+            self.added.update({mail: (user, now) for mail, user in added.items()})
+            self.users = {**self.users, **added}
+
+    def age(self):
+        return None if self.loaded_at is None else time.monotonic() - self.loaded_at
+
+    def lookup(self, email):
+        if self.changed and self.changed():
+            self.invalidate()
+        if self.loaded_at is None or self.invalidated_at is not None:
+            # Concurrent lookups share one load
+            with self.load_lock:
+                if self.loaded_at is None or self.invalidated_at is not None:
+                    self.refresh()
+        age = self.age()
+        user = self.users.get(email)
+        # Users added outside this process and the change log show up after a throttled background reload
+        if age > self.ttl or (user is None and age > self.miss_refresh_interval):
+            self.refresh_async()
+        return user
+
+    def check_credentials(self, email, password):
+        if not email or not password:
+            return False, None
+        user = self.lookup(email)
+        stored_hashed_password = user[1] if user else None
+        if verify_password(stored_hashed_password, password) and user is not None:
+            return True, email
+        return False, None
@@ -0,0 +1,192 @@
+import argparse
+import datetime
+import json
+import logging
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from column_profiler import profile_executor, profile_frame, summary_table
+from dashboard_pipeline import CHART_QUERIES, CHART_FIGURES, FigureCache, clean_data
+from kpi_engine import KPIEngine, compute_kpis
+from query_backend import DuckDBBackend
+
+DEFAULT_SIZES = [100_000, 1_000_000, 10_000_000]
+DEFAULT_HISTORY = "benchmark_history.json"
+
+CATEGORIES = {
+    "Furniture": ["Bookcases", "Chairs", "Furnishings", "Tables"],
+    "Office Supplies": ["Appliances", "Art", "Binders", "Envelopes", "Fasteners", "Labels", "Paper", "Storage", "Supplies"],
+    "Technology": ["Accessories", "Copiers", "Machines", "Phones"]
+}
+SEGMENTS = ["Consumer", "Corporate", "Home Office"]
+SHIP_MODES = ["First Class", "Same Day", "Second Class", "Standard Class"]
+
+logging.basicConfig(filename="benchmark.log", level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+# Synthetic rows with the Cleaneddata schema; order, city and product cardinalities scale with the row count
+def generate_supply_chain_data(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    sub_categories = [(category, sub) for category, subs in CATEGORIES.items() for sub in subs]
+    n_products = max(rows // 50, 100)
+    n_cities = max(min(rows // 100, 5000), 50)
+    n_orders = max(rows // 2, 1)
+
+    product = rng.integers(0, n_products, rows)
+    product_sub = rng.integers(0, len(sub_categories), n_products)[product]
+    category = np.array([c for c, _ in sub_categories], dtype=object)[product_sub]
+    sub_category = np.array([s for _, s in sub_categories], dtype=object)[product_sub]
+    order_date = np.datetime64("2011-01-01") + rng.integers(0, 1461, rows).astype("timedelta64[D]")
+    lead_time = rng.integers(0, 8, rows)
+    sales = np.round(rng.gamma(1.2, 200.0, rows), 2)
+    discount = rng.choice([0.0, 0.1, 0.2, 0.3, 0.5], rows, p=[0.5, 0.2, 0.15, 0.1, 0.05])
+    profit = np.round(sales * (rng.normal(0.12, 0.2, rows) - discount / 2), 2)
+    shipping_cost = np.round(sales * rng.uniform(0.02, 0.15, rows), 2)
+
+    return pd.DataFrame({
+        "Order_ID": pd.Series(rng.integers(0, n_orders, rows)).map("ORD-{:08d}".format),
+        "Order_Date": order_date,
+        "Ship_Date": order_date + lead_time.astype("timedelta64[D]"),
+        "Ship_Mode": np.array(SHIP_MODES, dtype=object)[rng.integers(0, len(SHIP_MODES), rows)],
+        "Customer_ID": pd.Series(rng.integers(0, max(rows // 20, 10), rows)).map("CUS-{:07d}".format),
+        "Segment": np.array(SEGMENTS, dtype=object)[rng.integers(0, len(SEGMENTS), rows)],
+        "City": pd.Series(rng.integers(0, n_cities, rows)).map("City {:04d}".format),
+        "Product_ID": pd.Series(product).map("PRD-{:07d}".format),
+        "Category": category,
+        "Sub_Category": sub_category,
+        "Product_Name": pd.Series(product).map("Product {:07d}".format),
+        "Sales": sales,
+        "Quantity": rng.integers(1, 15, rows),
+        "Discount": discount,
+        "Profit": profit,
+        "Shipping_Cost": shipping_cost,
+        "Lead_Time": lead_time,
+        "Inventory_Turnover": sales / (shipping_cost + 1)
+    })
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# Runs every dashboard stage once over a synthetic table of the given size
+def run_benchmark(rows, seed=0):
+    timings = {}
+
+    def stage(name, func):
+        start = time.perf_counter()
+        result = func()
+        seconds = time.perf_counter() - start
+        timings[name] = {
+            "seconds": round(seconds, 6),
+            "rows_per_second": round(rows / seconds, 1) if seconds > 0 else None,
+            "peak_rss_mb": round(peak_rss_mb(), 1)
+        }
+        logging.info(f"Benchmark {rows} rows, stage {name}: {seconds:.3f}s")
+        return result
+
+    data = stage("generate", lambda: generate_supply_chain_data(rows, seed))
+    backend = stage("load", lambda: DuckDBBackend(tables={"Cleaneddata": data}))
+    del data
+
+    df = stage("fetch", lambda: backend.query("SELECT * FROM Cleaneddata"))
+    df = stage("cleaning", lambda: clean_data(df))
+    stage("kpis", lambda: compute_kpis(df))
+    stage("kpi_engine", lambda: KPIEngine(df).metrics())
+    # Mirrors the Dataset Summary in advanced_analysis.py (workers are started before the stage, as they are in the app)
+    executor = profile_executor()
+    try:
+        stage("dataset_summary", lambda: summary_table(profile_frame(df, executor=executor)))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    chart_frames = stage("chart_queries", lambda: {name: backend.query(sql) for name, sql in CHART_QUERIES.items()})
+    figures = stage("figures", lambda: {name: CHART_FIGURES[name](frame) for name, frame in chart_frames.items()})
+    payloads = stage("serialization", lambda: {name: fig.to_json() for name, fig in figures.items()})
+    figure_cache = FigureCache()
+    for name, frame in chart_frames.items():
+        figure_cache.get(name, frame)
+    stage("figures_cached", lambda: {name: figure_cache.get(name, frame) for name, frame in chart_frames.items()})
+
+    return {
+        "rows": rows,
+        "payload_bytes": sum(len(payload) for payload in payloads.values()),
+        "stages": timings
+    }
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_history(path, history):
+    with open(path, "w") as f:
+        json.dump(history, f, indent=2)
+
+
+# Compares a run against the best of the recent runs at the same size
+def find_regressions(result, history, threshold=1.25, window=5, min_seconds=0.05):
+    previous = [run for run in history if run["rows"] == result["rows"]][-window:]
+    regressions = []
+    for name, timing in result["stages"].items():
+        baseline = min((run["stages"][name]["seconds"] for run in previous if name in run["stages"]), default=None)
+        if baseline is None:
+            continue
+        if timing["seconds"] > baseline * threshold and timing["seconds"] - baseline > min_seconds:
+            regressions.append(
+                f"{result['rows']:,} rows / {name}: {timing['seconds']:.3f}s vs best {baseline:.3f}s "
+                f"(+{(timing['seconds'] / baseline - 1) * 100:.0f}%)"
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the supply chain dashboard pipeline.")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_SIZES, help="Table sizes to benchmark")
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="JSON file the results are appended to")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Allowed slowdown versus the recent best")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-save", action="store_true", help="Check for regressions without recording the run")
+    args = parser.parse_args(argv)
+
+    history = load_history(args.history)
+    commit = os.popen("git rev-parse --short HEAD 2>/dev/null").read().strip() or None
+    regressions = []
+    for rows in args.rows:
+        # A fresh process per size keeps the peak RSS of one size from leaking into the next
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            result = pool.submit(run_benchmark, rows, args.seed).result()
+        result["timestamp"] = datetime.datetime.now().isoformat(timespec="seconds")
+        result["commit"] = commit
+
+        print(f"\n{rows:,} rows (figure payload {result['payload_bytes'] / 1024 ** 2:,.1f} MB)")
+        for name, timing in result["stages"].items():
+            print(f"  {name:<16} {timing['seconds']:>9.3f}s  {timing['rows_per_second'] or 0:>14,.0f} rows/s  {timing['peak_rss_mb']:>9,.1f} MB")
+
+        regressions += find_regressions(result, history, args.threshold)
+        history.append(result)
+
+    if not args.no_save:
+        save_history(args.history, history)
+
+    if regressions:
+        print("\nPerformance regressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
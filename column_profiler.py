@@ -0,0 +1,257 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from dashboard_pipeline import HISTOGRAM_BINS
+
+CHUNK_ROWS = 65_536
+TOP_K = 20
+# Distinct values tracked exactly per column; past this, counts become Misra-Gries lower bounds
+TOP_K_CAPACITY = 1024
+QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+QUANTILE_SKETCH_SIZE = 512
+HLL_PRECISION = 12
+# Below this many cells profiling stays in-process; spawning workers would cost more than it saves
+PARALLEL_MIN_CELLS = 2_000_000
+
+
+# HyperLogLog distinct-count estimate over 64-bit hashes (~1.6% error at the default precision)
+class DistinctSketch:
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, hashes):
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.intp)
+        rest = hashes << np.uint64(self.precision)
+        bit_length = np.zeros(len(rest), dtype=np.int64)
+        nonzero = rest > 0
+        # frexp's exponent is the bit length; float rounding can overshoot 64 by one
+        bit_length[nonzero] = np.minimum(np.frexp(rest[nonzero].astype(np.float64))[1], 64)
+        rank = np.minimum(65 - bit_length, 65 - self.precision).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = np.count_nonzero(self.registers == 0)
+        if raw <= 2.5 * m and zeros:
+            return m * np.log(m / zeros)
+        return raw
+
+
+# Mergeable quantile sketch (KLL-style compactors): level L holds samples of weight 2**L
+class QuantileSketch:
+    def __init__(self, size=QUANTILE_SKETCH_SIZE, seed=0):
+        self.size = size
+        self.levels = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self.size:
+                items = np.sort(items)
+                # An odd item out stays at this level so the total weight is preserved
+                self.levels[level] = items[len(items) - len(items) % 2:]
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                promoted = items[:len(items) - len(items) % 2][self.rng.integers(2)::2]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def quantiles(self, qs):
+        values = np.concatenate(self.levels)
+        if not len(values):
+            return [None] * len(qs)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        cumulative = np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, np.asarray(qs) * cumulative[-1], side="left")
+        return values[order][np.minimum(positions, len(values) - 1)].tolist()
+
+
+def _kind(values):
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return "datetime"
+    if pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype):
+        return "numeric"
+    return "categorical"
+
+
+# Runs in a worker process: one chunked pass over a column feeding every statistic and sketch
+def profile_column(name, values):
+    if isinstance(values, pa.Array):
+        values = values.to_numpy(zero_copy_only=False)
+    values = np.asarray(values)
+    kind = _kind(values)
+    if kind == "datetime":
+        values = values.astype("datetime64[ns]")
+    nulls = 0
+    infinite = 0
+    count = 0
+    # Values behind min/max, the moments, the sketch and the histogram; ±inf are only counted
+    finite = 0
+    mean = 0.0
+    m2 = 0.0
+    low = high = None
+    distinct = DistinctSketch()
+    sketch = QuantileSketch()
+    counts = pd.Series(dtype="int64")
+    truncated = False
+
+    for start in range(0, len(values), CHUNK_ROWS):
+        chunk = values[start:start + CHUNK_ROWS]
+        missing = pd.isna(chunk)
+        chunk = chunk[~missing]
+        nulls += int(missing.sum())
+        if not len(chunk):
+            continue
+
+        if kind == "categorical":
+            chunk_counts = pd.Series(chunk).value_counts()
+            # The distinct sketch ignores repeats, so hashing each chunk's unique values is enough
+            distinct.update(pd.util.hash_array(chunk_counts.index.to_numpy()))
+            counts = pd.concat([counts, chunk_counts]).groupby(level=0, sort=False).sum()
+            if len(counts) > TOP_K_CAPACITY:
+                counts = counts - counts.nlargest(TOP_K_CAPACITY + 1).iloc[-1]
+                counts = counts[counts > 0]
+                truncated = True
+            count += len(chunk)
+            continue
+
+        distinct.update(pd.util.hash_array(chunk))
+        count += len(chunk)
+        numbers = (chunk.view("int64") if kind == "datetime" else chunk).astype(np.float64)
+        is_finite = np.isfinite(numbers)
+        if not is_finite.all():
+            infinite += int(len(numbers) - is_finite.sum())
+            numbers = numbers[is_finite]
+            if not len(numbers):
+                continue
+        low = numbers.min() if low is None else min(low, numbers.min())
+        high = numbers.max() if high is None else max(high, numbers.max())
+        sketch.update(numbers)
+        # Chan et al. merge of the running mean / sum of squared deviations
+        chunk_mean = numbers.mean()
+        chunk_m2 = ((numbers - chunk_mean) ** 2).sum()
+        total = finite + len(numbers)
+        delta = chunk_mean - mean
+        mean += delta * len(numbers) / total
+        m2 += chunk_m2 + delta ** 2 * finite * len(numbers) / total
+        finite = total
+
+    profile = {
+        "column": name,
+        "kind": kind,
+        "dtype": str(values.dtype),
+        "count": count,
+        "nulls": nulls,
+        "infinite": infinite,
+        "distinct": len(counts) if kind == "categorical" and not truncated else int(round(distinct.estimate())),
+        "distinct_exact": kind == "categorical" and not truncated,
+        "min": None,
+        "max": None,
+        "mean": None,
+        "std": None,
+        "quantiles": {},
+        "top": None,
+        "top_exact": not truncated,
+        "histogram": None
+    }
+
+    if kind == "categorical":
+        top = counts.nlargest(TOP_K).astype("int64")
+        profile["top"] = pd.DataFrame({name: top.index, "count": top.to_numpy()})
+        return profile
+
+    quantiles = sketch.quantiles(QUANTILES)
+    if kind == "datetime":
+        to_value = lambda number: None if number is None else pd.Timestamp(int(number))
+    else:
+        to_value = lambda number: number
+    profile["min"] = to_value(low)
+    profile["max"] = to_value(high)
+    profile["quantiles"] = {q: to_value(value) for q, value in zip(QUANTILES, quantiles)}
+    if kind == "numeric" and finite:
+        profile["mean"] = mean
+        profile["std"] = float(np.sqrt(m2 / (finite - 1))) if finite > 1 else 0.0
+        # Histogram bars need min/max first, so they take a second vectorized pass over the finite values
+        numbers = values[~pd.isna(values)].astype(np.float64)
+        numbers = numbers[np.isfinite(numbers)]
+        bars, _ = np.histogram(numbers, bins=HISTOGRAM_BINS, range=(low, high if high > low else low + 1))
+        # Same shape as the binned histogram queries, so dashboard_pipeline.binned_histogram can draw it
+        profile["histogram"] = pd.DataFrame({
+            "Bin": np.arange(HISTOGRAM_BINS), "Order_Count": bars, "Low": low, "High": high
+        })
+    return profile
+
+
+def profile_executor(max_workers=None):
+    max_workers = max_workers or min(os.cpu_count() or 1, 4)
+    # A single worker only adds transfer overhead to the in-process pass
+    if max_workers < 2:
+        return None
+    # spawn, since forking the threaded Streamlit server is unsafe
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+# Text columns go to workers as Arrow arrays, which pickle as raw buffers instead of one object per cell
+def _transferable(values):
+    if values.dtype == object:
+        try:
+            return pa.array(values, from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass
+    return values
+
+
+# Profiles every column of a frame, one column per worker when the frame is large enough to pay for it
+def profile_frame(df, executor=None, min_parallel_cells=PARALLEL_MIN_CELLS):
+    names = list(df.columns)
+    columns = [df[name].to_numpy() for name in names]
+    if executor is not None and df.size >= min_parallel_cells and names:
+        profiles = list(executor.map(profile_column, names, [_transferable(values) for values in columns]))
+    else:
+        profiles = [profile_column(name, values) for name, values in zip(names, columns)]
+    logging.info(f"Profiled {len(names)} columns over {len(df)} rows.")
+    return {profile["column"]: profile for profile in profiles}
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return f"{value:.6g}"
+    return str(value)
+
+
+# One row per column, replacing df.describe() in the Dataset Summary
+def summary_table(profiles):
+    rows = []
+    for name, profile in profiles.items():
+        top = profile["top"]
+        rows.append({
+            "Column": name,
+            "Type": profile["dtype"],
+            "Count": profile["count"],
+            "Nulls": profile["nulls"],
+            "Infinite": profile["infinite"],
+            "Distinct": str(profile["distinct"]) if profile["distinct_exact"] else f"~{profile['distinct']}",
+            # Cells mix numbers, timestamps and labels across columns, so they are shown as text
+            "Min": _cell(profile["min"]),
+            "Max": _cell(profile["max"]),
+            "Mean": _cell(profile["mean"]),
+            "Std": _cell(profile["std"]),
+            **{f"{q:.0%}": _cell(value) for q, value in profile["quantiles"].items()},
+            "Top": _cell(top.iloc[0, 0]) if top is not None and len(top) else ""
+        })
+    return pd.DataFrame(rows).fillna("")
@@ -0,0 +1,190 @@
+import logging
+import os
+
+import pandas as pd
+import streamlit as st
+from google.cloud import bigquery
+from google.oauth2 import service_account
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from dashboard_pipeline import (CHART_QUERIES, KPI_MONTHS_QUERY, KPI_ROWS_QUERY, MONTHLY_ROLLUP_QUERY, FigureCache,
+                                build_fetch_query, query_reads_months)
+from dml_guard import ALL_PARTITIONS, ChangeLog, changed_partitions
+from forecast_service import ForecastService, add_forecast_overlay
+from frame_store import FrameStore
+from kpi_engine import KPIEngine
+from product_search import ProductSearchIndex
+from query_backend import PROJECT_DATASET, BigQueryBackend, DuckDBBackend, backend_name
+from scheduler import BackgroundScheduler
+
+# Resources and helpers shared by Supply_chain_analysis.py and Supply_chain_analysis_admin.py
+
+STREAM_POLL_SECONDS = 0.5
+
+
+# Streamlit session of the running script; None on background threads
+def current_session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else None
+
+
+@st.cache_resource
+def get_bigquery_client():
+    credentials = service_account.Credentials.from_service_account_file("Own Credentials")
+    return bigquery.Client(credentials=credentials)
+
+@st.cache_resource
+def get_query_backend():
+    if backend_name() == "duckdb":
+        return DuckDBBackend.from_excel()
+    return BigQueryBackend(get_bigquery_client())
+
+def run_query(query, params=None):
+    return get_query_backend().query(query, params)
+
+
+@st.cache_resource
+def get_frame_store():
+    return FrameStore(budget_bytes=int(os.environ.get("FRAME_STORE_BUDGET_MB", 1024)) * 1024 * 1024)
+
+def run_shared_query(query, params=None, key=None):
+    return get_frame_store().get(key or query, lambda: run_query(query, params), current_session_id())
+
+# Streaming counterpart of run_shared_query: on_page(page, stream) sees each result page as it arrives, and
+# on_page(None, stream) every STREAM_POLL_SECONDS while the query is still running. Those are Streamlit calls,
+# which is where a Cancel Fetch click (or any other rerun) stops this script run.
+def stream_shared_query(query, params, key, on_page):
+    def load():
+        stream = get_query_backend().stream(query, params)
+        pages = []
+        try:
+            while not stream.wait(STREAM_POLL_SECONDS):
+                on_page(None, stream)
+            for page in stream:
+                pages.append(page)
+                on_page(page, stream)
+        except Exception:
+            stream.cancel()
+            raise
+        except BaseException:
+            # Streamlit stops a run with a BaseException; the query must not outlive the fetch
+            stream.cancel()
+            st.session_state.interrupted_fetch_rows = stream.rows_read
+            raise
+        finally:
+            stream.close()
+        if stream.cancelled.is_set():
+            raise RuntimeError("Query stream was cancelled before it finished.")
+        return pd.concat(pages, ignore_index=True) if pages else pd.DataFrame()
+
+    # Loaded under the frame store's per-key lock, so concurrent sessions share one stream
+    return get_frame_store().get(key, load, current_session_id())
+
+
+# Distinct product names indexed locally so searches never hit BigQuery
+@st.cache_resource
+def get_product_index():
+    return ProductSearchIndex()
+
+@st.cache_data(ttl=3600)
+def refresh_product_index():
+    query = "SELECT DISTINCT Product_ID, Product_Name FROM `macro-aurora-434314-h7.Supplychainanalysis.Cleaneddata`"
+    return get_product_index().add(run_query(query))
+
+
+def show_kpis(slot, kpis):
+    with slot.container():
+        # Display key metrics
+        st.subheader("📊 Key Metrics")
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("💰 Total Sales", f"${kpis['total_sales']:,.2f}")
+        col2.metric("🏙️ Total Cities", f"{kpis['total_cities']}")
+        col3.metric("📈 Profit Percentage", f"{kpis['profit_percentage']:.2f}%")
+        col4.metric("⚡ Sales Rate", f"${kpis['sales_rate']:,.2f} per order")
+
+
+# Figures are rebuilt only when the data behind them changes
+@st.cache_resource
+def get_figure_cache():
+    return FigureCache()
+
+# KPI partial aggregates over the whole table, shared across reruns and sessions.
+# No TTL: the scheduler's refresh_rollups reloads it in place, so requests never wait on a rebuild.
+@st.cache_resource
+def get_kpi_engine():
+    return KPIEngine(run_query(KPI_ROWS_QUERY))
+
+
+# Seasonal forecasts are fitted in a background process pool and only read here
+@st.cache_resource
+def get_forecast_service():
+    return ForecastService()
+
+def overlay_forecasts(fig, metric, category="All", segment="All"):
+    forecast_service = get_forecast_service()
+    overall = forecast_service.forecast(metric)
+    if overall is None:
+        st.caption("⏳ Forecast is still being prepared and will appear on a later run.")
+        return fig
+    fig = add_forecast_overlay(fig, overall)
+    if category != "All" or segment != "All":
+        sliced = forecast_service.forecast(metric, category, segment)
+        if sliced is not None:
+            fig = add_forecast_overlay(fig, sliced, name=f"Forecast ({category} / {segment})")
+    return fig
+
+
+# Background jobs keep the default dashboard warm; one scheduler per server process
+@st.cache_resource
+def get_scheduler(default_date_range):
+    def warm_query_backend():
+        # Parses the bundled workbook into DuckDB when running offline
+        get_query_backend()
+
+    def warm_default_dashboard():
+        frame_store = get_frame_store()
+        query, query_parameters, key = build_fetch_query(date_range=default_date_range)
+        frame_store.refresh(key, lambda: run_query(query, query_parameters))
+        for chart_query in list(CHART_QUERIES.values()) + [MONTHLY_ROLLUP_QUERY]:
+            frame_store.refresh(chart_query, lambda chart_query=chart_query: run_query(chart_query))
+
+    kpi_engine_built = [False]
+
+    def refresh_rollups():
+        # The first run builds the engine; later runs rebuild it aside and swap the new cells in
+        if kpi_engine_built[0]:
+            get_kpi_engine().reload(run_query(KPI_ROWS_QUERY))
+        else:
+            get_kpi_engine()
+            kpi_engine_built[0] = True
+        refresh_product_index.clear()
+        refresh_product_index()
+        get_forecast_service().update(get_frame_store().get(MONTHLY_ROLLUP_QUERY, lambda: run_query(MONTHLY_ROLLUP_QUERY)))
+
+    change_log = ChangeLog()
+    change_log_offset = [change_log.end()]
+
+    # Admin DML confirmed since the last check invalidates only the months it touched
+    def apply_change_log():
+        entries, change_log_offset[0] = change_log.read(change_log_offset[0])
+        changed = changed_partitions(entries, f"{PROJECT_DATASET}.Cleaneddata")
+        if not changed:
+            return
+        months = None if ALL_PARTITIONS in changed else sorted(changed)
+        frame_store = get_frame_store()
+        frame_store.invalidate(lambda key: query_reads_months(key, months))
+        if months is None:
+            get_kpi_engine().reload(run_query(KPI_ROWS_QUERY))
+        else:
+            get_kpi_engine().replace_months(months, run_query(KPI_MONTHS_QUERY, {"months": months}))
+        refresh_product_index.clear()
+        refresh_product_index()
+        get_forecast_service().update(frame_store.get(MONTHLY_ROLLUP_QUERY, lambda: run_query(MONTHLY_ROLLUP_QUERY)))
+        logging.info(f"Applied {len(entries)} change log entries for months {months or 'all'}.")
+
+    scheduler = BackgroundScheduler()
+    scheduler.add_job("warm_query_backend", warm_query_backend, at="02:00")
+    scheduler.add_job("warm_default_dashboard", warm_default_dashboard, every=1800, at="06:00")
+    scheduler.add_job("refresh_rollups", refresh_rollups, every=3600, at="06:00")
+    scheduler.add_job("apply_change_log", apply_change_log, every=30, run_at_start=False)
+    return scheduler.start()
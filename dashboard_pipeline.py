@@ -0,0 +1,237 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from kpi_engine import KPI_COLUMNS
+
+HISTOGRAM_BINS = 30
+# Scatter charts with more points than this are drawn with WebGL
+WEBGL_POINT_THRESHOLD = 1000
+
+# SQL behind each dashboard chart; histograms are binned in the query so only the bars reach the browser
+CHART_QUERIES = {
+    "monthly_orders": """
+        SELECT 
+            EXTRACT(YEAR FROM Order_Date) AS Year, 
+            FORMAT_DATE('%Y-%m', Order_Date) AS Month, 
+            COUNT(DISTINCT Order_ID) AS Order_Count
+        FROM `macro-aurora-434314-h7.Supplychainanalysis.Cleaneddata`
+        GROUP BY Year, Month
+        ORDER BY Year, Month;
+    """,
+    "monthly_sales": """
+        SELECT 
+            FORMAT_DATE('%Y-%m', Order_Date) AS Order_Month, 
+            SUM(Sales) AS Total_Sales
+        FROM `macro-aurora-434314-h7.Supplychainanalysis.Cleaneddata`
+        GROUP BY Order_Month
+        ORDER BY Order_Month;
+    """,
+    "lead_time": """
+        SELECT Lead_Time, COUNT(*) AS Order_Count
+        FROM `macro-aurora-434314-h7.Supplychainanalysis.Cleaneddata`
+        WHERE Lead_Time IS NOT NULL
+        GROUP BY Lead_Time
+        ORDER BY Lead_Time;
+    """,
+    "sales_profit": """
+        SELECT Sales, Profit, Category, Product_Name
+        FROM `macro-aurora-434314-h7.Supplychainanalysis.Cleaneddata`
+        WHERE Sales IS NOT NULL AND Profit IS NOT NULL;
+    """,
+    "category_sales": """
+        SELECT Category, SUM(Sales) AS Total_Sales
+        FROM `macro-aurora-434314-h7.Supplychainanalysis.Cleaneddata`
+        WHERE Sales IS NOT NULL
+        GROUP BY Category
+        ORDER BY Total_Sales DESC;
+    """,
+    "inventory_turnover": f"""
+        WITH bounds AS (
+            SELECT MIN(Inventory_Turnover) AS Low, MAX(Inventory_Turnover) AS High
+            FROM `macro-aurora-434314-h7.Supplychainanalysis.Cleaneddata`
+            WHERE Inventory_Turnover IS NOT NULL
+        )
+        SELECT
+            COALESCE(LEAST(CAST(FLOOR((Inventory_Turnover - Low) / NULLIF(High - Low, 0) * {HISTOGRAM_BINS}) AS INT64), {HISTOGRAM_BINS - 1}), 0) AS Bin,
+            ANY_VALUE(Low) AS Low,
+            ANY_VALUE(High) AS High,
+            COUNT(*) AS Order_Count
+        FROM `macro-aurora-434314-h7.Supplychainanalysis.Cleaneddata` CROSS JOIN bounds
+        WHERE Inventory_Turnover IS NOT NULL
+        GROUP BY Bin
+        ORDER BY Bin;
+    """,
+    "segment_sales": """
+        SELECT Segment, SUM(Sales) AS Total_Sales
+        FROM `macro-aurora-434314-h7.Supplychainanalysis.Cleaneddata`
+        WHERE Sales IS NOT NULL
+        GROUP BY Segment
+        ORDER BY Total_Sales DESC;
+    """
+}
+
+# Monthly sales and distinct orders for every (category, segment) slice, "All" marking a rolled-up dimension.
+# GROUPING() tells rolled-up rows from rows whose Category/Segment is really NULL, which stay NULL.
+MONTHLY_ROLLUP_QUERY = """
+    SELECT
+        Order_Month,
+        CASE WHEN Category_Rollup = 1 THEN 'All' ELSE Category END AS Category,
+        CASE WHEN Segment_Rollup = 1 THEN 'All' ELSE Segment END AS Segment,
+        Total_Sales,
+        Order_Count
+    FROM (
+        SELECT
+            FORMAT_DATE('%Y-%m', Order_Date) AS Order_Month,
+            Category,
+            Segment,
+            GROUPING(Category) AS Category_Rollup,
+            GROUPING(Segment) AS Segment_Rollup,
+            SUM(Sales) AS Total_Sales,
+            COUNT(DISTINCT Order_ID) AS Order_Count
+        FROM `macro-aurora-434314-h7.Supplychainanalysis.Cleaneddata`
+        WHERE Order_Date IS NOT NULL
+        GROUP BY GROUPING SETS ((Order_Month, Category, Segment), (Order_Month, Category), (Order_Month, Segment), (Order_Month))
+    )
+    ORDER BY Order_Month;
+"""
+
+# Rows behind the KPI engine; DISTINCT over whole rows drops the same duplicates clean_data does
+KPI_ROWS_QUERY = f"""
+    SELECT {', '.join(KPI_COLUMNS)}
+    FROM (SELECT DISTINCT * FROM `macro-aurora-434314-h7.Supplychainanalysis.Cleaneddata`)
+"""
+KPI_MONTHS_QUERY = KPI_ROWS_QUERY + "    WHERE FORMAT_DATE('%Y-%m', Order_Date) IN UNNEST(@months)\n"
+
+
+# Main dashboard query for the sidebar filters; returns the SQL, its parameters and the shared-store key
+def build_fetch_query(product_name=None, category=None, segment=None, date_range=None, product_ids=None,
+                      sort_column="Sales", sort_order="Ascending"):
+    query = "SELECT * FROM macro-aurora-434314-h7.Supplychainanalysis.Cleaneddata WHERE 1=1"
+
+    query_parameters = {}
+    if product_ids is not None:
+        query += " AND Product_ID IN UNNEST(@product_ids)"
+        query_parameters["product_ids"] = list(product_ids)
+    elif product_name:
+        query += f" AND LOWER(Product_Name) LIKE '%{product_name.lower()}%'"
+
+    if category and category != "All":
+        query += f" AND LOWER(Category) = '{category.lower()}'"
+
+    if segment and segment != "All":
+        query += f" AND LOWER(Segment) = '{segment.lower()}'"
+
+    if date_range:
+        query += f" AND Order_Date BETWEEN '{date_range[0]}' AND '{date_range[1]}'"
+
+    query += f" ORDER BY {sort_column} {'ASC' if sort_order == 'Ascending' else 'DESC'}"
+    return query, query_parameters, (query, tuple(product_ids or ()))
+
+
+# Whether a shared-store key (a chart query, or a fetch query with its product ids) reads any of the
+# given months ("YYYY-MM"); months=None stands for the whole table
+def query_reads_months(key, months):
+    query = key[0] if isinstance(key, tuple) else key
+    match = re.search(r"Order_Date BETWEEN '(\d{4}-\d{2}-\d{2})' AND '(\d{4}-\d{2}-\d{2})'", query)
+    if months is None or match is None:
+        return True
+    start, end = (pd.Period(day, freq="M") for day in match.groups())
+    return any(start <= pd.Period(month, freq="M") <= end for month in months)
+
+
+def clean_data(df):
+    df["Order_Date"] = pd.to_datetime(df["Order_Date"], errors="coerce")
+    df["Ship_Date"] = pd.to_datetime(df["Ship_Date"], errors="coerce")
+
+    df.fillna({
+        "Discount": df["Discount"].median(),
+        "Profit": df["Profit"].median(),
+        "Sales": df["Sales"].median(),
+        "Shipping_Cost": df["Shipping_Cost"].median()
+    }, inplace=True)
+
+    df.drop_duplicates(inplace=True)
+    df["Lead_Time"] = (df["Ship_Date"] - df["Order_Date"]).dt.days.fillna(0)
+    df["Inventory_Turnover"] = df["Sales"] / (df["Shipping_Cost"] + 1)
+
+    df["Category"] = df["Category"].str.lower()
+    df["Sub_Category"] = df["Sub_Category"].str.lower()
+    df["Segment"] = df["Segment"].str.lower()
+    return df
+
+
+# Bars for a histogram whose bins were counted by the query (Bin, Low, High, Order_Count)
+def binned_histogram(df, value, title, color):
+    width = (df["High"].iloc[0] - df["Low"].iloc[0]) / HISTOGRAM_BINS if not df.empty else 0
+    width = width or 1
+    low = df["Low"].iloc[0] if not df.empty else 0
+    fig = go.Figure(go.Bar(
+        x=(low + (df["Bin"].to_numpy() + 0.5) * width).astype("float64"),
+        y=df["Order_Count"].to_numpy().astype("int64"),
+        width=width,
+        marker_color=color
+    ))
+    fig.update_layout(title=title, xaxis_title=value, yaxis_title="count", bargap=0)
+    return fig
+
+
+def count_histogram(df, value, title, color):
+    fig = px.bar(df, x=value, y="Order_Count", title=title, color_discrete_sequence=[color])
+    fig.update_layout(yaxis_title="count", bargap=0)
+    return fig
+
+
+def sales_profit_scatter(df):
+    render_mode = "webgl" if len(df) > WEBGL_POINT_THRESHOLD else "svg"
+    df = df.astype({"Sales": "float64", "Profit": "float64"})
+    return px.scatter(df, x="Sales", y="Profit", color="Category", title="Sales vs. Profit", hover_data=["Product_Name"], render_mode=render_mode)
+
+
+# Plotly figure for each chart, built from the result of its CHART_QUERIES entry
+CHART_FIGURES = {
+    "monthly_orders": lambda df: px.line(df, x="Month", y="Order_Count", markers=True, title="Monthly Order Trend"),
+    "monthly_sales": lambda df: px.line(df, x="Order_Month", y="Total_Sales", markers=True, title="Monthly Sales Trend"),
+    "lead_time": lambda df: count_histogram(df, "Lead_Time", "Lead Time Distribution", "#636EFA"),
+    "sales_profit": sales_profit_scatter,
+    "category_sales": lambda df: px.pie(df, names="Category", values="Total_Sales", title="Sales by Category", color_discrete_sequence=px.colors.qualitative.Pastel),
+    "inventory_turnover": lambda df: binned_histogram(df, "Inventory_Turnover", "Inventory Turnover Distribution", "#EF553B"),
+    "segment_sales": lambda df: px.bar(df, x="Segment", y="Total_Sales", title="Sales by Segment", color="Segment", color_discrete_sequence=px.colors.qualitative.Set3)
+}
+
+
+def data_fingerprint(df):
+    digest = hashlib.sha1(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    digest.update(repr(list(df.columns)).encode())
+    return digest.hexdigest()
+
+
+# Built figures keyed by (chart, data fingerprint), shared across reruns and sessions
+class FigureCache:
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name, df):
+        key = (name, data_fingerprint(df))
+        with self.lock:
+            figure = self.entries.get(key)
+            if figure is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return figure
+            self.misses += 1
+        figure = CHART_FIGURES[name](df)
+        with self.lock:
+            self.entries[key] = figure
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return figure
@@ -0,0 +1,164 @@
+import csv
+import datetime
+import json
+import logging
+import os
+import re
+import threading
+
+from query_backend import PROJECT_DATASET
+
+# Statements above either limit are blocked at preview time
+DML_MAX_BYTES = int(os.environ.get("DML_MAX_MB", 10 * 1024)) * 1024 * 1024
+DML_MAX_ROWS = int(os.environ.get("DML_MAX_ROWS", 10_000))
+DEFAULT_CHANGE_LOG = os.environ.get("DML_CHANGE_LOG", "dml_change_log.jsonl")
+
+# Date column whose month is the unit the dashboards cache and invalidate by
+PARTITION_COLUMNS = {f"{PROJECT_DATASET}.Cleaneddata": "Order_Date"}
+ALL_PARTITIONS = "*"
+
+
+def build_dml(operation, table, columns=None, values=None, set_clause=None, condition=None):
+    if operation == "Insert":
+        return f"""
+                INSERT INTO `{table}` ({columns})
+                VALUES ({values})
+            """
+    if operation == "Update":
+        return f"""
+                UPDATE `{table}`
+                SET {set_clause}
+                WHERE {condition}
+            """
+    if operation == "Delete":
+        return f"""
+                DELETE FROM `{table}`
+                WHERE {condition}
+            """
+    raise ValueError(f"Unknown DML operation: {operation}")
+
+
+# Month of the partition column in a single-row INSERT, read from the comma-separated inputs.
+# Anything that can't be read as a month (the column left out, NULL, an expression) counts as every month.
+def _insert_partitions(columns, values, partition_column):
+    names = [name.strip().strip("`").lower() for name in next(csv.reader([columns or ""]))]
+    if partition_column.lower() not in names:
+        return [ALL_PARTITIONS]
+    literals = next(csv.reader([values or ""], quotechar="'", skipinitialspace=True))
+    if len(literals) != len(names):
+        return [ALL_PARTITIONS]
+    match = re.search(r"\d{4}-\d{2}", literals[names.index(partition_column.lower())])
+    return [match.group()] if match else [ALL_PARTITIONS]
+
+
+# Dry-runs the statement and counts the rows its predicate matches; nothing is modified
+def preview_dml(client, operation, table, columns=None, values=None, set_clause=None, condition=None,
+                max_bytes=DML_MAX_BYTES, max_rows=DML_MAX_ROWS):
+    from google.cloud import bigquery
+
+    sql = build_dml(operation, table, columns, values, set_clause, condition)
+    dry_run = client.query(sql, job_config=bigquery.QueryJobConfig(dry_run=True, use_query_cache=False))
+    # The inputs are spliced into SQL; anything that parses as more than the one expected statement (e.g. a
+    # SCRIPT from "TRUE; DELETE ...") is refused before the row count below runs it for real
+    if dry_run.statement_type != operation.upper():
+        raise ValueError(f"Expected a single {operation.upper()} statement, got {dry_run.statement_type}.")
+    bytes_processed = dry_run.total_bytes_processed or 0
+
+    partition_column = PARTITION_COLUMNS.get(table)
+    if operation == "Insert":
+        affected_rows = 1
+        partitions = _insert_partitions(columns, values, partition_column) if partition_column else []
+    else:
+        select = "COUNT(*) AS affected_rows"
+        if partition_column:
+            select += (f", ARRAY_AGG(DISTINCT FORMAT_DATE('%Y-%m', {partition_column}) IGNORE NULLS) AS months"
+                       f", COUNTIF({partition_column} IS NULL) AS undated_rows")
+        row = list(client.query(f"SELECT {select} FROM `{table}` WHERE {condition}").result())[0]
+        affected_rows = row["affected_rows"]
+        partitions = sorted(row["months"]) if partition_column else []
+        # Matched rows without a date have no month to scope the invalidation to
+        if partition_column and row["undated_rows"]:
+            partitions = [ALL_PARTITIONS]
+        # Updated rows may move to months the predicate can't tell us about
+        if operation == "Update" and partition_column and re.search(rf"\b{partition_column}\b", set_clause or "", re.IGNORECASE):
+            partitions = [ALL_PARTITIONS]
+
+    blocked = []
+    if bytes_processed > max_bytes:
+        blocked.append(f"Processes {bytes_processed / 1024 ** 3:,.2f} GB, above the {max_bytes / 1024 ** 3:,.2f} GB limit.")
+    if affected_rows > max_rows:
+        blocked.append(f"Affects {affected_rows:,} rows, above the {max_rows:,} row limit.")
+
+    logging.info(f"DML preview on {table}: {operation}, {bytes_processed} bytes, {affected_rows} rows, blocked={bool(blocked)}.")
+    return {
+        "operation": operation,
+        "table": table,
+        "sql": sql,
+        "bytes_processed": bytes_processed,
+        "affected_rows": affected_rows,
+        "partitions": partitions,
+        "blocked": blocked
+    }
+
+
+# Append-only record of confirmed DML; the dashboards follow it to invalidate only the months that changed
+class ChangeLog:
+    def __init__(self, path=DEFAULT_CHANGE_LOG):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def record(self, table, operation, partitions, rows=None, user=None):
+        entry = {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "table": table,
+            "operation": operation,
+            "partitions": list(partitions),
+            "rows": rows,
+            "user": user
+        }
+        with self.lock, open(self.path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+        logging.info(f"Change log: {operation} on {table}, partitions {entry['partitions']}.")
+        return entry
+
+    def end(self):
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    # Entries appended after a byte offset, and the offset to continue from
+    def read(self, offset=0):
+        if not os.path.exists(self.path):
+            return [], 0
+        with open(self.path, "rb") as f:
+            # A shorter file means the log was rotated; start over
+            if offset > os.fstat(f.fileno()).st_size:
+                offset = 0
+            f.seek(offset)
+            data = f.read()
+        # A line still being written is left for the next read
+        complete = data[:data.rfind(b"\n") + 1]
+        entries = [json.loads(line) for line in complete.splitlines() if line.strip()]
+        return entries, offset + len(complete)
+
+    # Callable reporting whether entries changing the table were appended since its previous call
+    def follow(self, table):
+        offset = [self.end()]
+        lock = threading.Lock()
+
+        def changed():
+            with lock:
+                entries, offset[0] = self.read(offset[0])
+            return bool(changed_partitions(entries, table))
+        return changed
+
+
+# Months of a table changed by the given entries (ALL_PARTITIONS for unknown ones), or None if it is untouched.
+# Only an entry known to have changed no rows may leave its months empty.
+def changed_partitions(entries, table):
+    months = None
+    for entry in entries:
+        if entry["table"] == table:
+            partitions = set(entry["partitions"])
+            if not partitions and entry.get("rows") != 0:
+                partitions = {ALL_PARTITIONS}
+            months = (months or set()) | partitions
+    return months
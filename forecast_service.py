@@ -0,0 +1,141 @@
+import hashlib
+import logging
+import multiprocessing
+import threading
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+SEASONAL_PERIODS = 12
+METRICS = ["Total_Sales", "Order_Count"]
+
+
+# Runs in a worker process: fits one monthly series and returns its forecast
+def fit_forecast(key, months, values, horizon):
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+
+    values = np.asarray(values, dtype="float64")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        if len(values) >= 2 * SEASONAL_PERIODS:
+            model = ExponentialSmoothing(values, trend="add", seasonal="add", seasonal_periods=SEASONAL_PERIODS,
+                                         initialization_method="estimated")
+            forecast = model.fit().forecast(horizon)
+        elif len(values) >= 3:
+            forecast = ExponentialSmoothing(values, trend="add", initialization_method="estimated").fit().forecast(horizon)
+        else:
+            forecast = np.repeat(values[-1] if len(values) else 0.0, horizon)
+
+    last = pd.Period(months[-1], freq="M")
+    future_months = [str(last + step) for step in range(1, horizon + 1)]
+    return key, future_months, np.maximum(forecast, 0).tolist()
+
+
+# (metric, category, segment) -> (months, values) from the MONTHLY_ROLLUP_QUERY result, missing months as 0
+def monthly_series(rollup):
+    rollup = rollup.assign(
+        Category=rollup["Category"].str.lower(),
+        Segment=rollup["Segment"].str.lower(),
+        Order_Month=pd.PeriodIndex(rollup["Order_Month"], freq="M")
+    )
+    months = pd.period_range(rollup["Order_Month"].min(), rollup["Order_Month"].max(), freq="M")
+    series = {}
+    for (category, segment), group in rollup.groupby(["Category", "Segment"]):
+        totals = group.groupby("Order_Month")[METRICS].sum().reindex(months, fill_value=0)
+        for metric in METRICS:
+            series[(metric, category, segment)] = ([str(month) for month in months], totals[metric].tolist())
+    return series
+
+
+def _fingerprint(months, values):
+    return hashlib.sha1(repr((months, values)).encode()).hexdigest()
+
+
+# Fits seasonal models off the request path and serves cached forecasts
+class ForecastService:
+    def __init__(self, horizon=6, executor=None, max_workers=2):
+        self.horizon = horizon
+        self.executor = executor
+        self.max_workers = max_workers
+        self.forecasts = {}
+        self.fingerprints = {}
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def _executor(self):
+        if self.executor is None:
+            # spawn, since forking the threaded Streamlit server is unsafe
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+        return self.executor
+
+    # Schedules refits for series whose months or values changed; returns how many were scheduled
+    def update(self, rollup):
+        scheduled = 0
+        for key, (months, values) in monthly_series(rollup).items():
+            fingerprint = _fingerprint(months, values)
+            with self.lock:
+                if self.fingerprints.get(key) == fingerprint:
+                    continue
+                try:
+                    future = self._executor().submit(fit_forecast, key, months, values, self.horizon)
+                except BrokenProcessPool:
+                    logging.warning("Forecast process pool broke; starting a new one.")
+                    self.executor = None
+                    future = self._executor().submit(fit_forecast, key, months, values, self.horizon)
+                self.fingerprints[key] = fingerprint
+                self.pending[key] = future
+            future.add_done_callback(lambda done, key=key, fingerprint=fingerprint: self._store(key, fingerprint, done))
+            scheduled += 1
+        if scheduled:
+            logging.info(f"Scheduled {scheduled} forecast refits.")
+        return scheduled
+
+    def _store(self, key, fingerprint, future):
+        try:
+            _, months, values = future.result()
+        except Exception as e:
+            logging.error(f"Forecast fit failed for {key}: {e}")
+            months = None
+        with self.lock:
+            if self.pending.get(key) is future:
+                del self.pending[key]
+            # A newer refit may have been scheduled while this one ran
+            if self.fingerprints.get(key) != fingerprint:
+                return
+            if months is None:
+                del self.fingerprints[key]
+                return
+            self.forecasts[key] = pd.DataFrame({"Order_Month": months, "Forecast": values})
+
+    # Cached forecast for a slice, or None while it is still being fitted
+    def forecast(self, metric, category="All", segment="All"):
+        key = (metric, (category or "All").lower(), (segment or "All").lower())
+        with self.lock:
+            return self.forecasts.get(key)
+
+    def wait(self, timeout=None):
+        with self.lock:
+            futures = list(self.pending.values())
+        for future in futures:
+            try:
+                future.result(timeout=timeout)
+            except Exception:
+                pass
+
+    def status(self):
+        with self.lock:
+            return {"forecasts": len(self.forecasts), "pending": len(self.pending)}
+
+
+# Copy of a cached trend figure with a dashed forecast line appended
+def add_forecast_overlay(fig, forecast, name="Forecast"):
+    fig = go.Figure(fig)
+    fig.add_trace(go.Scatter(
+        x=forecast["Order_Month"], y=forecast["Forecast"], mode="lines+markers", name=name,
+        line={"dash": "dash"}
+    ))
+    return fig
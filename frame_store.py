@@ -0,0 +1,141 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def frame_bytes(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+# Query results shared read-only by every session, bounded by a global memory budget (LRU eviction)
+class FrameStore:
+    def __init__(self, budget_bytes=1024 * 1024 * 1024, ttl=3600, session_ttl=3600):
+        self.budget_bytes = budget_bytes
+        self.ttl = ttl
+        self.session_ttl = session_ttl
+        self.entries = OrderedDict()
+        self.sessions = {}
+        self.lock = threading.RLock()
+        # key -> [lock, number of get() calls using it]; a lock lives only while a get() for its key is in flight
+        self.key_locks = {}
+
+    # Returns a session-private view of the shared frame; writes to it copy instead of touching the shared data
+    def get(self, key, loader, session_id=None):
+        with self.lock:
+            key_lock = self.key_locks.setdefault(key, [threading.Lock(), 0])
+            key_lock[1] += 1
+        try:
+            # One loader per key, so concurrent sessions asking for the same query share a single fetch
+            with key_lock[0]:
+                with self.lock:
+                    entry = self.entries.get(key)
+                    if entry and time.monotonic() - entry["loaded_at"] > self.ttl:
+                        self._drop(key)
+                        entry = None
+                if entry is None:
+                    frame = loader()
+                    entry = {"frame": frame, "bytes": frame_bytes(frame), "loaded_at": time.monotonic()}
+                    with self.lock:
+                        self.entries[key] = entry
+                        self._evict()
+                    logging.info(f"Frame store loaded {entry['bytes']} bytes for key {hash(key)}.")
+        finally:
+            with self.lock:
+                key_lock[1] -= 1
+                if not key_lock[1]:
+                    del self.key_locks[key]
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+            if session_id is not None:
+                self._session(session_id)["shared"].add(key)
+        return self.view(entry["frame"])
+
+    # The cached frame for a key without loading it, or None on a miss
+    def peek(self, key, session_id=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or time.monotonic() - entry["loaded_at"] > self.ttl:
+                return None
+            self.entries.move_to_end(key)
+            if session_id is not None:
+                self._session(session_id)["shared"].add(key)
+        return self.view(entry["frame"])
+
+    # Reloads a key and swaps the new frame in, so readers keep hitting the old one until it is ready
+    def refresh(self, key, loader):
+        frame = loader()
+        entry = {"frame": frame, "bytes": frame_bytes(frame), "loaded_at": time.monotonic()}
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            self._evict()
+        logging.info(f"Frame store refreshed {entry['bytes']} bytes for key {hash(key)}.")
+
+    def view(self, frame):
+        return frame.copy(deep=not pd.get_option("mode.copy_on_write"))
+
+    def invalidate(self, predicate=None):
+        with self.lock:
+            keys = [key for key in self.entries if predicate is None or predicate(key)]
+            for key in keys:
+                self._drop(key)
+        if keys:
+            logging.info(f"Frame store invalidated {len(keys)} entries.")
+        return len(keys)
+
+    # Records a frame a session has mutated and therefore holds privately
+    def track(self, session_id, name, frame):
+        with self.lock:
+            self._session(session_id)["private"][name] = frame_bytes(frame)
+
+    def total_bytes(self):
+        with self.lock:
+            return sum(entry["bytes"] for entry in self.entries.values())
+
+    def session_usage(self, session_id):
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                return {"shared_bytes": 0, "private_bytes": 0}
+            return {
+                "shared_bytes": sum(self.entries[key]["bytes"] for key in session["shared"] if key in self.entries),
+                "private_bytes": sum(session["private"].values())
+            }
+
+    # One row per session (only the given one, if any) plus a total over every session
+    def usage(self, session_id=None):
+        with self.lock:
+            self._expire_sessions()
+            session_ids = list(self.sessions) if session_id is None else [session_id]
+            rows = [{"Session": sid, **self.session_usage(sid)} for sid in session_ids]
+            rows.append({
+                "Session": f"All sessions ({len(self.sessions)})",
+                "shared_bytes": self.total_bytes(),
+                "private_bytes": sum(sum(session["private"].values()) for session in self.sessions.values())
+            })
+            return pd.DataFrame(rows, columns=["Session", "shared_bytes", "private_bytes"])
+
+    def _session(self, session_id):
+        session = self.sessions.setdefault(session_id, {"shared": set(), "private": {}, "seen_at": 0})
+        session["seen_at"] = time.monotonic()
+        return session
+
+    def _expire_sessions(self):
+        now = time.monotonic()
+        for session_id in [s for s, session in self.sessions.items() if now - session["seen_at"] > self.session_ttl]:
+            del self.sessions[session_id]
+
+    def _drop(self, key):
+        del self.entries[key]
+
+    def _evict(self):
+        total = sum(entry["bytes"] for entry in self.entries.values())
+        # The newest entry is kept even if it alone exceeds the budget
+        while total > self.budget_bytes and len(self.entries) > 1:
+            key, entry = self.entries.popitem(last=False)
+            total -= entry["bytes"]
+            logging.info(f"Frame store evicted {entry['bytes']} bytes for key {hash(key)}.")
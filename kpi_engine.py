@@ -0,0 +1,132 @@
+import threading
+
+import pandas as pd
+
+KPI_COLUMNS = ["Order_Date", "Category", "Segment", "City", "Order_ID", "Sales", "Profit"]
+CELL_KEYS = ["Month", "Category", "Segment"]
+
+
+def compute_kpis(df):
+    return _kpis(df["Sales"].sum(), df["Profit"].sum(), df["City"].nunique(), df["Order_ID"].nunique())
+
+
+def _kpis(total_sales, total_profit, total_cities, total_orders):
+    profit_percentage = (total_profit / total_sales) * 100 if total_sales > 0 else 0
+    sales_rate = total_sales / total_orders if total_orders > 0 else 0
+    return {
+        "total_sales": total_sales,
+        "total_cities": total_cities,
+        "profit_percentage": profit_percentage,
+        "sales_rate": sales_rate
+    }
+
+
+def _aggregate(rows, keys):
+    return rows.groupby(keys, observed=True, dropna=False).agg(
+        Sales=("Sales", "sum"),
+        Profit=("Profit", "sum"),
+        Cities=("City", lambda s: frozenset(s.dropna())),
+        Orders=("Order_ID", lambda s: frozenset(s.dropna())),
+        Missing=("Missing", "sum")
+    ).reset_index()
+
+
+def _prepare(df):
+    rows = df[KPI_COLUMNS].copy()
+    rows["Order_Date"] = pd.to_datetime(rows["Order_Date"], errors="coerce")
+    rows["Category"] = rows["Category"].str.lower()
+    rows["Segment"] = rows["Segment"].str.lower()
+    rows["Month"] = rows["Order_Date"].dt.to_period("M")
+    rows["Missing"] = rows["Sales"].isna() | rows["Profit"].isna()
+    return rows
+
+
+# Mergeable per (month, category, segment) partial aggregates for the key metrics.
+# Expects deduplicated rows (dashboard_pipeline.KPI_ROWS_QUERY), matching clean_data's drop_duplicates.
+class KPIEngine:
+    def __init__(self, df):
+        self.lock = threading.Lock()
+        self.reload(df)
+
+    # Rebuilds every cell from df and swaps them in at the end; metrics() keeps reading the old cells until then
+    def reload(self, df):
+        rows = _prepare(df)
+        month_rows = {month: group for month, group in rows.groupby("Month", observed=True)}
+        cells = _aggregate(rows, CELL_KEYS)
+        with self.lock:
+            self.month_rows = month_rows
+            self.cells = cells
+
+    # Rebuilds the given months (e.g. "2014-03") from their current rows in df; other months are kept
+    def replace_months(self, months, df):
+        months = {pd.Period(month, freq="M") for month in months}
+        rows = _prepare(df)
+        rows = rows[rows["Month"].isin(months)]
+        month_rows = {month: group for month, group in self.month_rows.items() if month not in months}
+        month_rows.update({month: group for month, group in rows.groupby("Month", observed=True)})
+        cells = pd.concat([self.cells[~self.cells["Month"].isin(months)], _aggregate(rows, CELL_KEYS)], ignore_index=True)
+        with self.lock:
+            self.month_rows = month_rows
+            self.cells = cells
+
+    def _filter(self, frame, category, segment):
+        if category and category != "All":
+            frame = frame[frame["Category"] == category.lower()]
+        if segment and segment != "All":
+            frame = frame[frame["Segment"] == segment.lower()]
+        return frame
+
+    def metrics(self, date_range=None, category=None, segment=None):
+        with self.lock:
+            cells, month_rows = self.cells, self.month_rows
+        cells = self._filter(cells, category, segment)
+        parts = [cells]
+
+        if date_range and len(date_range) == 2:
+            start = pd.Timestamp(date_range[0])
+            end = pd.Timestamp(date_range[1])
+            months = cells["Month"]
+            month_start = months.dt.start_time
+            month_end = months.dt.end_time.dt.normalize()
+            full = (month_start >= start) & (month_end <= end)
+            overlap = (month_start <= end) & (month_end >= start)
+
+            # Only months cut by the range boundary are rescanned at row level
+            edge_months = set(months[overlap & ~full])
+            parts = [cells[full]]
+            if edge_months:
+                rows = pd.concat([month_rows[month] for month in edge_months])
+                rows = self._filter(rows, category, segment)
+                rows = rows[rows["Order_Date"].between(start, end)]
+                parts.append(_aggregate(rows, ["Category"]))
+
+        combined = pd.concat(parts, ignore_index=True)
+        # clean_data fills NULL Sales/Profit with the median of the fetched rows, which the cells can't
+        # know; None sends the caller to compute_kpis on the cleaned frame instead
+        if combined["Missing"].sum():
+            return None
+        total_sales = combined["Sales"].sum()
+        total_cities = len(frozenset().union(*combined["Cities"]))
+        total_orders = len(frozenset().union(*combined["Orders"]))
+        return _kpis(total_sales, combined["Profit"].sum(), total_cities, total_orders)
+
+
+# Running totals behind compute_kpis, merged one result page at a time while a fetch streams in
+class KPIAccumulator:
+    def __init__(self):
+        self.rows = 0
+        self.sales = 0.0
+        self.profit = 0.0
+        self.cities = set()
+        self.orders = set()
+
+    def add(self, page):
+        self.rows += len(page)
+        self.sales += page["Sales"].sum()
+        self.profit += page["Profit"].sum()
+        self.cities.update(page["City"].dropna().unique())
+        self.orders.update(page["Order_ID"].dropna().unique())
+        return self
+
+    def kpis(self):
+        return _kpis(self.sales, self.profit, len(self.cities), len(self.orders))
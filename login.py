@@ -1,51 +1,39 @@
 import streamlit as st
-import hashlib
 from google.cloud import bigquery
 import subprocess
+from auth_backend import BigQueryUserStore, CredentialCache
+from dml_guard import ChangeLog
+from registration_queue import RegistrationQueue, PENDING, WRITTEN, DUPLICATE, FAILED
 
 # Configure BigQuery client
 client = bigquery.Client()
 TABLE_ID = "macro-aurora-434314-h7.Supplychainanalysis.UserTable"
 
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+# Shared across sessions so logins are served from the in-memory index
+@st.cache_resource
+def get_credential_cache():
+    # Admin UPDATE/DELETE on UserTable, recorded in the change log, takes effect on the next login
+    cache = CredentialCache(BigQueryUserStore(client, TABLE_ID), changed=ChangeLog().follow(TABLE_ID))
+    # Loads while the login form renders; the first lookup joins this load instead of starting another
+    cache.refresh_async()
+    return cache
 
 def check_credentials(email, password):
-    if not email or not password:
-        return False, None
-    
-    query = f"""
-    SELECT User_Name, Password FROM `{TABLE_ID}`
-    WHERE Mail_ID = @mail
-    """
-    query_job = client.query(query, job_config=bigquery.QueryJobConfig(
-        query_parameters=[
-            bigquery.ScalarQueryParameter("mail", "STRING", email)
-        ]
-    ))
-    result = query_job.result().to_dataframe()
-    
-    if result.empty:
-        return False, None
-    
-    stored_hashed_password = result.loc[0, "Password"]
-    return stored_hashed_password == hash_password(password), email
+    return get_credential_cache().check_credentials(email, password)
 
+@st.cache_resource
+def get_registration_queue():
+    cache = get_credential_cache()
+    return RegistrationQueue(
+        cache.store,
+        is_registered=lambda email: cache.lookup(email) is not None,
+        # Written rows go straight into the index, so new users can log in without a reload
+        on_written=cache.add_users
+    )
+
+# Queues the sign-up and returns its status without waiting for the write
 def register_user(username, email, password):
-    if not username or not email or not password:
-        return
-    hashed_password = hash_password(password)
-    query = f"""
-    INSERT INTO `{TABLE_ID}` (User_Name, Mail_ID, Password)
-    VALUES (@username, @email, @password)
-    """
-    client.query(query, job_config=bigquery.QueryJobConfig(
-        query_parameters=[
-            bigquery.ScalarQueryParameter("username", "STRING", username),
-            bigquery.ScalarQueryParameter("email", "STRING", email),
-            bigquery.ScalarQueryParameter("password", "STRING", hashed_password)
-        ]
-    ))
+    return get_registration_queue().submit(username, email, password)
 
 def main():
     st.markdown("""<style>""" + open("style.css").read() + """</style>""", unsafe_allow_html=True)
@@ -72,6 +60,21 @@ def main():
             st.session_state.login_success = False
             st.error("Invalid email or password")
     
+    pending_email = st.session_state.get("pending_signup")
+    if pending_email:
+        status = get_registration_queue().status(pending_email)
+        if status == WRITTEN:
+            st.success("Account created successfully!")
+        elif status == DUPLICATE:
+            st.error("An account with this email already exists")
+        elif status == FAILED:
+            st.error(f"Registration for {pending_email} failed. Please try signing up again.")
+        elif status is None:
+            # The queue was recreated (e.g. a server restart) and no longer knows this sign-up
+            st.warning(f"The status of the registration for {pending_email} is unknown. Try logging in, or sign up again.")
+        if status != PENDING:
+            st.session_state.pending_signup = None
+
     if st.button("Sign Up"):
         st.session_state.show_signup = True
     
@@ -84,9 +87,15 @@ def main():
         
         if st.button("Register"):
             if new_password == confirm_password:
-                register_user(new_username, email, new_password)
-                st.success("Account created successfully!")
-                st.session_state.show_signup = False
+                status = register_user(new_username, email, new_password)
+                if status == PENDING:
+                    st.session_state.pending_signup = email
+                    st.info("Registration received! Your account will be ready to log in in a few seconds.")
+                    st.session_state.show_signup = False
+                elif status == DUPLICATE:
+                    st.error("An account with this email already exists")
+                else:
+                    st.error("Please fill in all fields")
             else:
                 st.error("Passwords do not match")
 
@@ -0,0 +1,81 @@
+import bisect
+import logging
+import threading
+from collections import defaultdict
+
+MAX_GRAM = 3
+
+
+def _grams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+# N-gram inverted index over distinct product names for substring, prefix and autocomplete lookups
+class ProductSearchIndex:
+    def __init__(self, products=None):
+        self.names = []
+        self.name_ids = {}
+        self.lowered = []
+        self.postings = defaultdict(set)
+        self.sorted_names = []
+        self.lock = threading.Lock()
+        if products is not None:
+            self.add(products)
+
+    def __len__(self):
+        return len(self.names)
+
+    # Adds (Product_ID, Product_Name) rows; names already indexed only gain new IDs
+    def add(self, products):
+        added = 0
+        with self.lock:
+            for product_id, name in products[["Product_ID", "Product_Name"]].dropna().itertuples(index=False):
+                if name in self.name_ids:
+                    self.name_ids[name].add(product_id)
+                    continue
+                position = len(self.names)
+                lowered = name.lower()
+                self.names.append(name)
+                self.lowered.append(lowered)
+                self.name_ids[name] = {product_id}
+                for n in range(1, MAX_GRAM + 1):
+                    for gram in _grams(lowered, n):
+                        self.postings[gram].add(position)
+                bisect.insort(self.sorted_names, (lowered, position))
+                added += 1
+        if added:
+            logging.info(f"Product search index added {added} names ({len(self.names)} total).")
+        return added
+
+    def search(self, text):
+        text = text.lower()
+        if not text:
+            return []
+        query_grams = _grams(text, min(len(text), MAX_GRAM))
+        with self.lock:
+            candidates = set.intersection(*(self.postings.get(gram, set()) for gram in query_grams))
+            return sorted(self.names[i] for i in candidates if text in self.lowered[i])
+
+    def prefix(self, text, limit=None):
+        text = text.lower()
+        with self.lock:
+            start = bisect.bisect_left(self.sorted_names, (text, -1))
+            matches = []
+            for lowered, position in self.sorted_names[start:]:
+                if not lowered.startswith(text) or (limit and len(matches) >= limit):
+                    break
+                matches.append(self.names[position])
+        return matches
+
+    # Prefix matches first, then the remaining substring matches
+    def suggest(self, text, limit=10):
+        suggestions = self.prefix(text, limit)
+        if len(suggestions) < limit:
+            seen = set(suggestions)
+            suggestions += [name for name in self.search(text) if name not in seen][:limit - len(suggestions)]
+        return suggestions
+
+    def product_ids(self, text=None, names=None):
+        names = self.search(text) if names is None else names
+        with self.lock:
+            return sorted({product_id for name in names for product_id in self.name_ids.get(name, ())})
@@ -0,0 +1,265 @@
+import datetime
+import logging
+import os
+import re
+import threading
+import time
+
+import pandas as pd
+
+PROJECT_DATASET = "macro-aurora-434314-h7.Supplychainanalysis"
+DEFAULT_EXCEL_PATH = os.path.join("supply-chain-data", "Supply chain logisitcs problem.xlsx")
+STREAM_PAGE_ROWS = 50_000
+
+# Stand-in for Cleaneddata built from the bundled OrderList sheet. The workbook has no sales, profit or
+# product-category columns, so quantities and ports are mapped onto the dashboard schema as proxies.
+CLEANEDDATA_VIEW = """
+CREATE OR REPLACE VIEW Cleaneddata AS
+SELECT
+    CAST("Order ID" AS VARCHAR) AS Order_ID,
+    CAST("Order Date" AS DATE) AS Order_Date,
+    CAST("Order Date" AS DATE) + CAST(TPT AS INTEGER) AS Ship_Date,
+    "Service Level" AS Ship_Mode,
+    Customer AS Customer_ID,
+    "Plant Code" AS Segment,
+    "Destination Port" AS City,
+    CAST("Product ID" AS VARCHAR) AS Product_ID,
+    Carrier AS Category,
+    "Origin Port" AS Sub_Category,
+    'Product ' || CAST("Product ID" AS VARCHAR) AS Product_Name,
+    CAST("Unit quantity" AS DOUBLE) AS Sales,
+    CAST("Unit quantity" AS BIGINT) AS Quantity,
+    0.0 AS Discount,
+    CAST("Unit quantity" AS DOUBLE) - Weight AS Profit,
+    Weight AS Shipping_Cost,
+    TPT AS Lead_Time,
+    CAST("Unit quantity" AS DOUBLE) / (Weight + 1) AS Inventory_Turnover
+FROM OrderList
+"""
+
+
+def _sheet_table_name(sheet):
+    return re.sub(r"\W+", "_", sheet).strip("_")
+
+
+# BigQuery-flavoured SQL as written in the dashboards -> DuckDB SQL
+def translate_sql(sql):
+    sql = re.sub(r"`?" + re.escape(PROJECT_DATASET) + r"\.(\w+)`?", r"\1", sql)
+    sql = re.sub(r"FORMAT_DATE\(\s*('[^']*')\s*,\s*([^)]+?)\s*\)", r"strftime(\2, \1)", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"IN\s+UNNEST\(\s*@(\w+)\s*\)", r"IN (SELECT UNNEST($\1))", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"@(\w+)", r"$\1", sql)
+    return sql
+
+
+def _bigquery_parameter(name, value):
+    from google.cloud import bigquery
+
+    def type_of(item):
+        if isinstance(item, bool):
+            return "BOOL"
+        if isinstance(item, int):
+            return "INT64"
+        if isinstance(item, float):
+            return "FLOAT64"
+        if isinstance(item, datetime.datetime):
+            return "TIMESTAMP"
+        if isinstance(item, datetime.date):
+            return "DATE"
+        return "STRING"
+
+    if isinstance(value, (list, tuple)):
+        return bigquery.ArrayQueryParameter(name, type_of(value[0]) if value else "STRING", list(value))
+    return bigquery.ScalarQueryParameter(name, type_of(value), value)
+
+
+# Result pages of a running query as DataFrames; cancel() may be called from any thread
+class QueryStream:
+    def __init__(self, pages=None, cancel=None, ready=None, close=None):
+        self.pages = pages
+        self.total_rows = None
+        self.rows_read = 0
+        self.cancelled = threading.Event()
+        self._cancel = cancel
+        self._ready = ready
+        self._close = close
+
+    # Whether the query has finished running, waiting at most timeout seconds. Callers poll this before
+    # reading pages so they get control back while a long query runs (e.g. to let Streamlit stop the run).
+    def wait(self, timeout):
+        return self._ready is None or self._ready(timeout)
+
+    def __iter__(self):
+        while not self.cancelled.is_set():
+            try:
+                page = next(self.pages)
+            except StopIteration:
+                return
+            except Exception:
+                # Cancelling interrupts the download, which surfaces as an error from the backend
+                if self.cancelled.is_set():
+                    return
+                raise
+            self.rows_read += len(page)
+            yield page
+
+    def cancel(self):
+        if self.cancelled.is_set():
+            return
+        self.cancelled.set()
+        if self._cancel:
+            try:
+                self._cancel()
+            except Exception as e:
+                logging.warning(f"Query cancellation failed: {e}")
+        logging.info(f"Query stream cancelled after {self.rows_read} rows.")
+
+    def close(self):
+        self.pages.close()
+        if self._close:
+            self._close()
+
+
+# Runs dashboard SQL against BigQuery
+class BigQueryBackend:
+    name = "bigquery"
+
+    def __init__(self, client):
+        self.client = client
+
+    def _job_config(self, params):
+        from google.cloud import bigquery
+
+        return bigquery.QueryJobConfig(
+            query_parameters=[_bigquery_parameter(name, value) for name, value in (params or {}).items()]
+        )
+
+    def query(self, sql, params=None):
+        return self.client.query(sql, job_config=self._job_config(params)).to_dataframe()
+
+    # Pages are yielded as they download; cancelling also cancels the BigQuery job
+    def stream(self, sql, params=None, page_size=STREAM_PAGE_ROWS):
+        job = self.client.query(sql, job_config=self._job_config(params))
+
+        # One job status poll per call; job.result() would block until the query finishes
+        def ready(timeout):
+            if job.done():
+                return True
+            time.sleep(timeout)
+            return False
+
+        stream = QueryStream(cancel=job.cancel, ready=ready)
+
+        def pages():
+            rows = job.result(page_size=page_size)
+            stream.total_rows = rows.total_rows
+            yield from rows.to_dataframe_iterable()
+
+        stream.pages = pages()
+        return stream
+
+
+# Runs the same SQL locally on DuckDB over the bundled workbook (or any registered frames)
+class DuckDBBackend:
+    name = "duckdb"
+
+    def __init__(self, tables=None):
+        import duckdb
+
+        self.conn = duckdb.connect()
+        self.lock = threading.Lock()
+        for table, df in (tables or {}).items():
+            self.register(table, df)
+
+    def register(self, table, df):
+        with self.lock:
+            self.conn.register(f"{table}_frame", df)
+            self.conn.execute(f"CREATE OR REPLACE TABLE {table} AS SELECT * FROM {table}_frame")
+            self.conn.unregister(f"{table}_frame")
+
+    @classmethod
+    def from_excel(cls, path=DEFAULT_EXCEL_PATH, cache_dir=None):
+        backend = cls()
+        cache_dir = cache_dir or os.path.join(os.path.dirname(path), ".parquet")
+        backend.load_excel(path, cache_dir)
+        return backend
+
+    # Parses the workbook once and keeps each sheet as Parquet, reused while the workbook is unchanged
+    def load_excel(self, path, cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+        manifest = os.path.join(cache_dir, "sheets.txt")
+        if os.path.exists(manifest) and os.path.getmtime(manifest) >= os.path.getmtime(path):
+            with open(manifest) as f:
+                tables = f.read().split()
+            with self.lock:
+                for table in tables:
+                    parquet_path = os.path.join(cache_dir, f"{table}.parquet")
+                    self.conn.execute(f"CREATE OR REPLACE TABLE {table} AS SELECT * FROM read_parquet('{parquet_path}')")
+            logging.info(f"Loaded {len(tables)} sheets from Parquet cache {cache_dir}.")
+        else:
+            sheets = pd.read_excel(path, sheet_name=None)
+            tables = []
+            for sheet, df in sheets.items():
+                table = _sheet_table_name(sheet)
+                self.register(table, df)
+                with self.lock:
+                    self.conn.execute(f"COPY {table} TO '{os.path.join(cache_dir, table + '.parquet')}' (FORMAT PARQUET)")
+                tables.append(table)
+            with open(manifest, "w") as f:
+                f.write("\n".join(tables))
+            logging.info(f"Parsed {len(tables)} sheets from {path} into {cache_dir}.")
+
+        if "OrderList" in tables:
+            with self.lock:
+                self.conn.execute(CLEANEDDATA_VIEW)
+        return tables
+
+    def query(self, sql, params=None):
+        with self.lock:
+            cursor = self.conn.cursor()
+        try:
+            return cursor.execute(translate_sql(sql), params or {}).df()
+        finally:
+            cursor.close()
+
+    # DuckDB fetches in vectors of 2048 rows; cancelling interrupts the cursor
+    def stream(self, sql, params=None, page_size=STREAM_PAGE_ROWS):
+        with self.lock:
+            cursor = self.conn.cursor()
+        executed = threading.Event()
+        errors = []
+
+        # The query runs on its own thread, so stream.wait() can time out while it does
+        def execute():
+            try:
+                cursor.execute(translate_sql(sql), params or {})
+            except Exception as e:
+                errors.append(e)
+            finally:
+                executed.set()
+
+        def close():
+            executed.wait()
+            cursor.close()
+
+        stream = QueryStream(cancel=cursor.interrupt, ready=executed.wait, close=close)
+
+        def pages():
+            try:
+                executed.wait()
+                if errors:
+                    raise errors[0]
+                while True:
+                    page = cursor.fetch_df_chunk(max(page_size // 2048, 1))
+                    if page.empty:
+                        return
+                    yield page
+            finally:
+                cursor.close()
+
+        stream.pages = pages()
+        threading.Thread(target=execute, name="duckdb-stream", daemon=True).start()
+        return stream
+
+
+def backend_name():
+    return os.environ.get("SUPPLY_CHAIN_BACKEND", "bigquery").lower()
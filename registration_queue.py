@@ -0,0 +1,133 @@
+import atexit
+import logging
+import threading
+import time
+
+from auth_backend import hash_password
+
+PENDING = "pending"
+WRITTEN = "written"
+FAILED = "failed"
+DUPLICATE = "duplicate"
+
+
+# Batches sign-ups and writes them to a user store from a background thread
+class RegistrationQueue:
+    def __init__(self, store, max_batch=50, max_wait=2.0, max_retries=5, backoff=0.5,
+                 is_registered=None, on_written=None):
+        self.store = store
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.is_registered = is_registered
+        self.on_written = on_written
+        self.pending = {}
+        self.statuses = {}
+        self.cond = threading.Condition()
+        self.flush_lock = threading.Lock()
+        self.worker = None
+        self.closed = False
+
+    def submit(self, username, email, password):
+        if not username or not email or not password:
+            return None
+        with self.cond:
+            if email in self.pending or self.statuses.get(email) == WRITTEN:
+                return DUPLICATE
+        if self.is_registered and self.is_registered(email):
+            return DUPLICATE
+        row = {"User_Name": username, "Mail_ID": email, "Password": hash_password(password)}
+        with self.cond:
+            if email in self.pending:
+                return DUPLICATE
+            self.pending[email] = {"row": row, "queued_at": time.monotonic(), "attempts": 0, "retry_at": 0}
+            self.statuses[email] = PENDING
+            self._start_worker()
+            self.cond.notify()
+        return PENDING
+
+    def status(self, email):
+        with self.cond:
+            return self.statuses.get(email)
+
+    # Write every pending row that is due (all of them when forced); returns the Mail_IDs confirmed in this flush
+    def flush(self, force=False):
+        with self.flush_lock:
+            return self._flush(force)
+
+    def _flush(self, force=False):
+        now = time.monotonic()
+        with self.cond:
+            batch = [entry for entry in self.pending.values() if force or entry["retry_at"] <= now]
+        if not batch:
+            return []
+
+        rows = [entry["row"] for entry in batch]
+        try:
+            failed, duplicates = self.store.insert_users(rows)
+        except Exception as e:
+            logging.error(f"Registration flush of {len(rows)} rows failed: {e}")
+            failed, duplicates = range(len(rows)), []
+        failed = set(failed)
+        duplicates = set(duplicates)
+
+        written = []
+        written_rows = []
+        with self.cond:
+            for index, entry in enumerate(batch):
+                email = entry["row"]["Mail_ID"]
+                # The Mail_ID already belongs to an account, e.g. one added after is_registered checked
+                if index in duplicates:
+                    del self.pending[email]
+                    self.statuses[email] = DUPLICATE
+                    continue
+                if index not in failed:
+                    del self.pending[email]
+                    self.statuses[email] = WRITTEN
+                    written.append(email)
+                    written_rows.append(entry["row"])
+                    continue
+                entry["attempts"] += 1
+                if entry["attempts"] >= self.max_retries:
+                    del self.pending[email]
+                    self.statuses[email] = FAILED
+                    logging.error(f"Registration for {email} dropped after {entry['attempts']} attempts.")
+                else:
+                    entry["retry_at"] = time.monotonic() + self.backoff * 2 ** (entry["attempts"] - 1)
+
+        if written:
+            logging.info(f"Registered {len(written)} users.")
+            if self.on_written:
+                self.on_written(written_rows)
+        return written
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+        if self.worker:
+            self.worker.join()
+        # Last attempt for everything still queued, including rows waiting out a backoff
+        self.flush(force=True)
+
+    def _start_worker(self):
+        if self.worker is None:
+            self.worker = threading.Thread(target=self._run, name="registration-queue", daemon=True)
+            self.worker.start()
+            # The daemon worker dies with the interpreter, so queued sign-ups are flushed on exit
+            atexit.register(self.close)
+
+    def _due(self):
+        now = time.monotonic()
+        due = [entry for entry in self.pending.values() if entry["retry_at"] <= now]
+        return len(due) >= self.max_batch or any(now - entry["queued_at"] >= self.max_wait for entry in due)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.closed and not self._due():
+                    self.cond.wait(timeout=self.max_wait / 4)
+                if self.closed:
+                    return
+            self.flush()
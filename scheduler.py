@@ -0,0 +1,131 @@
+import datetime
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+
+def _next_daily(at, now):
+    hour, minute = (int(part) for part in at.split(":"))
+    run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    return run if run > now else run + datetime.timedelta(days=1)
+
+
+# In-process background jobs on an interval ("every" seconds) or daily ("at" HH:MM) schedule
+class BackgroundScheduler:
+    def __init__(self, max_workers=2, tick=1.0):
+        self.jobs = {}
+        self.tick = tick
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scheduler-job")
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def add_job(self, name, func, every=None, at=None, run_at_start=True):
+        if every is None and at is None:
+            raise ValueError("A job needs an 'every' interval or a daily 'at' time.")
+        now = datetime.datetime.now()
+        with self.lock:
+            self.jobs[name] = {
+                "func": func,
+                "every": every,
+                "at": at,
+                "next_run": now if run_at_start else self._next_run(every, at, now),
+                "running": False,
+                "runs": 0,
+                "last_started": None,
+                "last_success": None,
+                "last_duration": None,
+                "last_error": None
+            }
+
+    def _next_run(self, every, at, now):
+        candidates = []
+        if every is not None:
+            candidates.append(now + datetime.timedelta(seconds=every))
+        if at is not None:
+            candidates.append(_next_daily(at, now))
+        return min(candidates)
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="background-scheduler", daemon=True)
+            self.thread.start()
+            logging.info(f"Background scheduler started with {len(self.jobs)} jobs.")
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+        self.executor.shutdown(wait=True)
+
+    def run_now(self, name):
+        with self.lock:
+            self.jobs[name]["next_run"] = datetime.datetime.now()
+
+    def _run(self):
+        while not self.stopped.is_set():
+            now = datetime.datetime.now()
+            with self.lock:
+                due = [name for name, job in self.jobs.items() if not job["running"] and job["next_run"] <= now]
+                for name in due:
+                    self.jobs[name]["running"] = True
+            for name in due:
+                self.executor.submit(self._execute, name)
+            self.stopped.wait(self.tick)
+
+    def _execute(self, name):
+        job = self.jobs[name]
+        started = datetime.datetime.now()
+        start = time.perf_counter()
+        error = None
+        try:
+            job["func"]()
+        except Exception as e:
+            error = str(e)
+            logging.error(f"Background job {name} failed: {e}")
+        duration = time.perf_counter() - start
+        with self.lock:
+            job["running"] = False
+            job["runs"] += 1
+            job["last_started"] = started
+            job["last_duration"] = duration
+            job["last_error"] = error
+            if error is None:
+                job["last_success"] = datetime.datetime.now()
+            job["next_run"] = self._next_run(job["every"], job["at"], datetime.datetime.now())
+        logging.info(f"Background job {name} finished in {duration:.2f}s.")
+
+    def wait_idle(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            now = datetime.datetime.now()
+            with self.lock:
+                busy = any(job["running"] or job["next_run"] <= now for job in self.jobs.values())
+            if not busy or (deadline and time.monotonic() > deadline):
+                return not busy
+            time.sleep(0.05)
+
+    # One row per job: schedule, last duration and how stale its last successful run is
+    def status(self):
+        now = datetime.datetime.now()
+        with self.lock:
+            rows = [{
+                "Job": name,
+                "Schedule": ", ".join(
+                    part for part in [
+                        f"every {job['every']}s" if job["every"] is not None else None,
+                        f"daily at {job['at']}" if job["at"] is not None else None
+                    ] if part
+                ),
+                "Running": job["running"],
+                "Runs": job["runs"],
+                "Last Duration (s)": None if job["last_duration"] is None else round(job["last_duration"], 3),
+                "Staleness (s)": None if job["last_success"] is None else round((now - job["last_success"]).total_seconds()),
+                "Next Run": job["next_run"].strftime("%Y-%m-%d %H:%M:%S"),
+                "Last Error": job["last_error"]
+            } for name, job in self.jobs.items()]
+        return pd.DataFrame(rows)
@@ -154,3 +154,800 @@ def test_lead_time_negative_values():
     assert (df["Lead_Time"] >= 0).all(), "Lead time contains negative values"
     
     logging.info("Lead time calculation passed.")
+
+### 5. Login Credential Cache
+
+def test_credential_cache_sqlite_store():
+    logging.info("Testing credential cache against a SQLite user store.")
+    from auth_backend import CredentialCache, SQLiteUserStore, hash_password
+    
+    store = SQLiteUserStore()
+    store.insert_users([{"User_Name": "alice", "Mail_ID": "alice@example.com", "Password": hash_password("secret")}])
+    cache = CredentialCache(store)
+    
+    assert cache.check_credentials("alice@example.com", "secret") == (True, "alice@example.com")
+    assert cache.check_credentials("alice@example.com", "wrong") == (False, None)
+    assert cache.check_credentials("nobody@example.com", "secret") == (False, None)
+    assert cache.check_credentials("", "") == (False, None)
+    
+    logging.info("Credential cache passed.")
+
+def test_credential_cache_serves_from_memory():
+    logging.info("Testing credential cache avoids store reads after warmup.")
+    from auth_backend import CredentialCache, SQLiteUserStore, hash_password
+    
+    store = SQLiteUserStore()
+    cache = CredentialCache(store)
+    store.insert_users([{"User_Name": "bob", "Mail_ID": "bob@example.com", "Password": hash_password("pw")}])
+    cache.refresh()
+    cache.check_credentials("bob@example.com", "pw")
+    
+    with patch.object(store, "load_users", side_effect=AssertionError("store read after warmup")):
+        assert cache.check_credentials("bob@example.com", "pw")[0]
+    
+    logging.info("Credential cache warm path passed.")
+
+def test_credential_cache_refreshes_in_background():
+    logging.info("Testing credential cache serves stale data while one reload runs.")
+    import threading
+    import time
+    from auth_backend import CredentialCache, SQLiteUserStore
+    
+    store = SQLiteUserStore()
+    cache = CredentialCache(store, miss_refresh_interval=0)
+    assert cache.lookup("carol@example.com") is None
+    store.insert_users([{"User_Name": "carol", "Mail_ID": "carol@example.com", "Password": "hash"}])
+    
+    release = threading.Event()
+    load_users = store.load_users
+    with patch.object(store, "load_users", side_effect=lambda: release.wait(5) and load_users()) as load:
+        started = time.monotonic()
+        # Misses return at once from the old index instead of waiting on the store
+        assert cache.lookup("carol@example.com") is None
+        assert cache.lookup("carol@example.com") is None
+        assert time.monotonic() - started < 1
+        release.set()
+        for _ in range(200):
+            if cache.lookup("carol@example.com"):
+                break
+            time.sleep(0.01)
+        assert cache.lookup("carol@example.com") == ("carol", "hash")
+        assert load.call_count == 1
+    
+    logging.info("Credential cache background refresh passed.")
+
+def test_credential_cache_follows_admin_changes(tmp_path):
+    logging.info("Testing credential cache reloads on admin UserTable changes.")
+    from auth_backend import CredentialCache, SQLiteUserStore, hash_password
+    from dml_guard import ChangeLog
+
+    table = "macro-aurora-434314-h7.Supplychainanalysis.UserTable"
+    change_log = ChangeLog(str(tmp_path / "changes.jsonl"))
+    store = SQLiteUserStore()
+    store.insert_users([
+        {"User_Name": "dave", "Mail_ID": "dave@example.com", "Password": hash_password("old")},
+        {"User_Name": "erin", "Mail_ID": "erin@example.com", "Password": hash_password("pw")}
+    ])
+    cache = CredentialCache(store, changed=change_log.follow(table))
+    assert cache.check_credentials("dave@example.com", "old")[0]
+    assert cache.check_credentials("erin@example.com", "pw")[0]
+
+    # Changes to other tables, or DML that changed no rows, keep the index
+    change_log.record("macro-aurora-434314-h7.Supplychainanalysis.Cleaneddata", "DELETE", ["2024-01"], 3)
+    change_log.record(table, "DELETE", [], 0)
+    with patch.object(store, "load_users", side_effect=AssertionError("reload without a UserTable change")):
+        assert cache.check_credentials("dave@example.com", "old")[0]
+
+    with store.lock:
+        store.conn.execute("UPDATE UserTable SET Password = ? WHERE Mail_ID = 'dave@example.com'", (hash_password("new"),))
+        store.conn.execute("DELETE FROM UserTable WHERE Mail_ID = 'erin@example.com'")
+        store.conn.commit()
+    change_log.record(table, "UPDATE", [], 1)
+    change_log.record(table, "DELETE", [], 1)
+
+    # The very next login sees both changes
+    assert cache.check_credentials("dave@example.com", "old") == (False, None)
+    assert cache.check_credentials("dave@example.com", "new") == (True, "dave@example.com")
+    assert cache.check_credentials("erin@example.com", "pw") == (False, None)
+
+    logging.info("Credential cache admin change passed.")
+
+### 6. Registration Write Queue
+
+def test_registration_queue_batches_and_dedupes():
+    logging.info("Testing registration queue batching and Mail_ID dedupe.")
+    from auth_backend import CredentialCache, SQLiteUserStore
+    from registration_queue import RegistrationQueue, PENDING, DUPLICATE, WRITTEN
+    
+    store = SQLiteUserStore()
+    cache = CredentialCache(store)
+    cache.refresh()
+    queue = RegistrationQueue(store, max_wait=60, on_written=cache.add_users)
+    
+    assert queue.submit("carol", "carol@example.com", "pw") == PENDING
+    assert queue.submit("carol2", "carol@example.com", "pw") == DUPLICATE
+    assert queue.submit("dave", "dave@example.com", "pw") == PENDING
+    assert store.load_users() == {}
+    
+    assert sorted(queue.flush()) == ["carol@example.com", "dave@example.com"]
+    assert queue.status("carol@example.com") == WRITTEN
+    assert store.load_users()["carol@example.com"][0] == "carol"
+    with patch.object(store, "load_users", side_effect=AssertionError("store read after write")):
+        assert cache.check_credentials("dave@example.com", "pw") == (True, "dave@example.com")
+    
+    logging.info("Registration queue batching passed.")
+
+def test_registration_queue_retries_failed_rows():
+    logging.info("Testing registration queue retry with backoff.")
+    from auth_backend import SQLiteUserStore
+    from registration_queue import RegistrationQueue, PENDING, WRITTEN, FAILED
+    
+    store = SQLiteUserStore()
+    queue = RegistrationQueue(store, max_wait=60, max_retries=2, backoff=0)
+    queue.submit("erin", "erin@example.com", "pw")
+    
+    with patch.object(store, "insert_users", return_value=([0], [])):
+        assert queue.flush() == []
+    assert queue.status("erin@example.com") == PENDING
+    assert queue.flush() == ["erin@example.com"]
+    assert queue.status("erin@example.com") == WRITTEN
+    
+    queue.submit("frank", "frank@example.com", "pw")
+    with patch.object(store, "insert_users", side_effect=RuntimeError("quota exceeded")):
+        queue.flush()
+        queue.flush()
+    assert queue.status("frank@example.com") == FAILED
+    
+    # close() makes a last attempt even for rows still waiting out a backoff
+    queue = RegistrationQueue(store, max_wait=60, backoff=60)
+    queue.submit("gina", "gina@example.com", "pw")
+    with patch.object(store, "insert_users", return_value=([0], [])):
+        queue.flush()
+    queue.close()
+    assert queue.status("gina@example.com") == WRITTEN
+    
+    logging.info("Registration queue retry passed.")
+
+def test_registration_queue_rejects_existing_mail_id():
+    logging.info("Testing a sign-up for an existing Mail_ID never takes over the account.")
+    from unittest.mock import MagicMock
+    from auth_backend import BigQueryUserStore, CredentialCache, SQLiteUserStore, hash_password
+    from registration_queue import RegistrationQueue, DUPLICATE, WRITTEN
+    
+    store = SQLiteUserStore()
+    cache = CredentialCache(store, miss_refresh_interval=3600)
+    cache.refresh()
+    # Added outside this process after the cache loaded, so is_registered can't see it yet
+    victim = {"User_Name": "victor", "Mail_ID": "v@x.com", "Password": hash_password("good")}
+    assert store.insert_users([victim]) == ([], [])
+    queue = RegistrationQueue(store, max_wait=60, is_registered=lambda email: cache.lookup(email) is not None,
+                              on_written=cache.add_users)
+    
+    queue.submit("mallory", "v@x.com", "evil")
+    queue.submit("wendy", "w@x.com", "pw")
+    assert queue.flush() == ["w@x.com"]
+    assert queue.status("v@x.com") == DUPLICATE and queue.status("w@x.com") == WRITTEN
+    assert cache.check_credentials("v@x.com", "evil") == (False, None)
+    assert store.load_users()["v@x.com"] == ("victor", hash_password("good"))
+    # Retrying a row that already landed confirms it instead of reporting a duplicate
+    assert store.insert_users([victim]) == ([], [])
+    
+    client = MagicMock()
+    client.query.return_value.result.return_value = [{"Mail_ID": "v@x.com", "Password": hash_password("good")}]
+    mallory = {"User_Name": "mallory", "Mail_ID": "v@x.com", "Password": hash_password("evil")}
+    assert BigQueryUserStore(client, "p.d.UserTable").insert_users([mallory, victim]) == ([], [0])
+    assert "NOT EXISTS" in client.query.call_args_list[0].args[0]
+    
+    logging.info("Existing Mail_ID sign-up passed.")
+
+### 7. Incremental KPI Engine
+
+@pytest.mark.parametrize("date_range, category, segment", [
+    (None, "All", "All"),
+    (("2023-01-15", "2023-03-10"), "All", "All"),
+    (("2023-01-01", "2023-02-28"), "Furniture", "All"),
+    (("2023-02-01", "2023-03-31"), "All", "Consumer"),
+])
+def test_kpi_engine_matches_direct_computation(date_range, category, segment):
+    logging.info("Testing KPI engine against a full rescan.")
+    from kpi_engine import KPIEngine, compute_kpis
+    
+    df = pd.DataFrame({
+        "Order_Date": pd.to_datetime(["2023-01-10", "2023-01-20", "2023-02-05", "2023-02-25", "2023-03-05", "2023-03-20"]),
+        "Category": ["Furniture", "Technology", "Furniture", "Furniture", "Technology", "Furniture"],
+        "Segment": ["Consumer", "Corporate", "Consumer", "Home Office", "Consumer", "Corporate"],
+        "City": ["Chennai", "Delhi", "Chennai", "Mumbai", "Pune", "Delhi"],
+        "Order_ID": ["A", "B", "C", "C", "D", "E"],
+        "Sales": [100.0, 200.0, 50.0, 25.0, 400.0, 80.0],
+        "Profit": [10.0, -20.0, 5.0, 2.5, 40.0, 8.0]
+    })
+    
+    expected_rows = df
+    if category != "All":
+        expected_rows = expected_rows[expected_rows["Category"] == category]
+    if segment != "All":
+        expected_rows = expected_rows[expected_rows["Segment"] == segment]
+    if date_range:
+        expected_rows = expected_rows[expected_rows["Order_Date"].between(*pd.to_datetime(list(date_range)))]
+    
+    expected = compute_kpis(expected_rows)
+    actual = KPIEngine(df).metrics(date_range, category, segment)
+    
+    for key, value in expected.items():
+        assert actual[key] == pytest.approx(value), f"{key} does not match a full rescan"
+    
+    logging.info("KPI engine passed.")
+
+def test_kpi_engine_follows_clean_data():
+    logging.info("Testing KPI engine dedupe and NULL handling match clean_data.")
+    pytest.importorskip("duckdb")
+    from dashboard_pipeline import KPI_ROWS_QUERY, clean_data
+    from kpi_engine import KPIEngine, compute_kpis
+    from query_backend import DuckDBBackend
+    
+    table = pd.DataFrame({
+        "Order_ID": ["A", "A", "B", "C"],
+        "Order_Date": pd.to_datetime(["2023-01-10", "2023-01-10", "2023-01-20", "2023-02-05"]),
+        "Ship_Date": pd.to_datetime(["2023-01-12", "2023-01-12", "2023-01-25", "2023-02-07"]),
+        "Category": ["Furniture", "Furniture", "Technology", "Technology"],
+        "Sub_Category": ["Chairs", "Chairs", "Phones", "Phones"],
+        "Segment": ["Consumer", "Consumer", "Corporate", "Corporate"],
+        "City": ["Chennai", "Chennai", "Delhi", "Pune"],
+        "Sales": [100.0, 100.0, 200.0, None],
+        "Profit": [10.0, 10.0, -20.0, 5.0],
+        "Discount": [0.0, 0.0, 0.1, 0.2],
+        "Shipping_Cost": [5.0, 5.0, 7.0, 9.0]
+    })
+    engine = KPIEngine(DuckDBBackend({"Cleaneddata": table}).query(KPI_ROWS_QUERY))
+    
+    january = ("2023-01-01", "2023-01-31")
+    expected = compute_kpis(clean_data(table[table["Order_Date"].between(*pd.to_datetime(list(january)))]))
+    actual = engine.metrics(january)
+    for key, value in expected.items():
+        assert actual[key] == pytest.approx(value), f"{key} counts a duplicate row clean_data drops"
+    
+    # February has a NULL Sales that clean_data fills from the fetched rows' median
+    assert engine.metrics(("2023-02-01", "2023-02-28")) is None
+    assert engine.metrics() is None
+    
+    logging.info("KPI engine clean_data semantics passed.")
+
+def test_kpi_engine_reload_serves_old_cells_until_swapped():
+    logging.info("Testing KPI engine reload swaps cells only once they are built.")
+    import threading
+    import kpi_engine
+    from kpi_engine import KPIEngine
+    
+    def rows(sales):
+        return pd.DataFrame({
+            "Order_Date": pd.to_datetime(["2023-01-10", "2023-02-10"]), "Category": ["Furniture"] * 2,
+            "Segment": ["Consumer"] * 2, "City": ["Chennai", "Delhi"], "Order_ID": ["A", "B"],
+            "Sales": [sales, sales], "Profit": [1.0, 1.0]
+        })
+    
+    engine = KPIEngine(rows(100.0))
+    release = threading.Event()
+    aggregate = kpi_engine._aggregate
+    with patch("kpi_engine._aggregate", side_effect=lambda frame, keys: release.wait(5) and aggregate(frame, keys)):
+        reload = threading.Thread(target=engine.reload, args=(rows(300.0),))
+        reload.start()
+        assert engine.metrics()["total_sales"] == 200.0, "Readers should keep the old cells during a rebuild"
+        release.set()
+        reload.join()
+    assert engine.metrics()["total_sales"] == 600.0
+    
+    logging.info("KPI engine reload passed.")
+
+### 8. Product Search Index
+
+def test_product_search_index_lookups():
+    logging.info("Testing product name search index.")
+    from product_search import ProductSearchIndex
+    
+    index = ProductSearchIndex(pd.DataFrame({
+        "Product_ID": ["FUR-1", "FUR-2", "TEC-1", "TEC-2", "TEC-3"],
+        "Product_Name": ["Office Chair", "Bookcase", "Apple Phone", "Apple Phone", "Pineapple Print"]
+    }))
+    
+    assert index.search("apple") == ["Apple Phone", "Pineapple Print"]
+    assert index.search("CHA") == ["Office Chair"]
+    assert index.search("o") == ["Apple Phone", "Bookcase", "Office Chair"]
+    assert index.search("zzz") == []
+    assert index.suggest("app") == ["Apple Phone", "Pineapple Print"]
+    assert index.product_ids("apple phone") == ["TEC-1", "TEC-2"]
+    assert index.product_ids(names=["Bookcase"]) == ["FUR-2"]
+    
+    assert index.add(pd.DataFrame({"Product_ID": ["FUR-3", "FUR-2"], "Product_Name": ["Desk", "Bookcase"]})) == 1
+    assert index.search("desk") == ["Desk"]
+    
+    logging.info("Product search index passed.")
+
+### 9. Shared Frame Store
+
+def test_frame_store_copy_on_write():
+    logging.info("Testing shared frame store copy-on-write views.")
+    from frame_store import FrameStore
+    
+    store = FrameStore()
+    loads = []
+    def loader():
+        loads.append(1)
+        return pd.DataFrame({"Sales": [100.0, None, 100.0], "Profit": [10.0, 20.0, 10.0]})
+    
+    first = store.get("q", loader, session_id="s1")
+    first.fillna({"Sales": 0}, inplace=True)
+    first.drop_duplicates(inplace=True)
+    second = store.get("q", loader, session_id="s2")
+    
+    assert len(loads) == 1, "Shared frame was loaded more than once"
+    assert second["Sales"].isna().sum() == 1, "Session mutation leaked into the shared frame"
+    assert len(second) == 3
+    
+    store.track("s1", "df", first)
+    assert store.session_usage("s1")["private_bytes"] > 0
+    assert store.session_usage("s2")["shared_bytes"] == store.total_bytes()
+    assert store.usage("s2")["Session"].tolist() == ["s2", "All sessions (2)"]
+    assert store.key_locks == {}, "Per-key load locks outlived their loads"
+    
+    logging.info("Frame store copy-on-write passed.")
+
+def test_frame_store_evicts_over_budget():
+    logging.info("Testing frame store memory budget eviction.")
+    from frame_store import FrameStore, frame_bytes
+    
+    frame = pd.DataFrame({"Sales": range(1000)})
+    store = FrameStore(budget_bytes=int(frame_bytes(frame) * 2.5))
+    for key in ["a", "b", "c"]:
+        store.get(key, lambda: frame.copy())
+    store.get("a", lambda: frame.copy())
+    
+    assert store.total_bytes() <= store.budget_bytes
+    assert set(store.entries) == {"c", "a"}
+    
+    logging.info("Frame store eviction passed.")
+
+### 10. Offline DuckDB Query Backend
+
+def test_translate_sql_to_duckdb():
+    logging.info("Testing BigQuery to DuckDB SQL translation.")
+    from query_backend import translate_sql
+    
+    sql = translate_sql("""
+        SELECT FORMAT_DATE('%Y-%m', Order_Date) AS Month
+        FROM `macro-aurora-434314-h7.Supplychainanalysis.Cleaneddata`
+        WHERE Product_ID IN UNNEST(@product_ids)
+    """)
+    
+    assert "strftime(Order_Date, '%Y-%m')" in sql
+    assert "FROM Cleaneddata" in sql
+    assert "IN (SELECT UNNEST($product_ids))" in sql
+    
+    logging.info("SQL translation passed.")
+
+def test_duckdb_backend_runs_dashboard_sql(tmp_path):
+    logging.info("Testing DuckDB backend over the bundled workbook.")
+    pytest.importorskip("duckdb")
+    from query_backend import DuckDBBackend
+    
+    backend = DuckDBBackend.from_excel(cache_dir=str(tmp_path))
+    df = backend.query("""
+        SELECT FORMAT_DATE('%Y-%m', Order_Date) AS Order_Month, SUM(Sales) AS Total_Sales
+        FROM `macro-aurora-434314-h7.Supplychainanalysis.Cleaneddata`
+        GROUP BY Order_Month
+        ORDER BY Order_Month;
+    """)
+    assert not df.empty, "Monthly sales query returned no rows"
+    
+    product_id = backend.query("SELECT Product_ID FROM Cleaneddata LIMIT 1").iloc[0, 0]
+    rows = backend.query(
+        "SELECT * FROM macro-aurora-434314-h7.Supplychainanalysis.Cleaneddata WHERE 1=1 AND Product_ID IN UNNEST(@product_ids)",
+        {"product_ids": [product_id]}
+    )
+    assert (rows["Product_ID"] == product_id).all()
+    
+    reloaded = DuckDBBackend.from_excel(cache_dir=str(tmp_path))
+    assert len(reloaded.query("SELECT * FROM Cleaneddata")) == len(backend.query("SELECT * FROM Cleaneddata"))
+    
+    logging.info("DuckDB backend passed.")
+
+### 11. Pipeline Benchmark Harness
+
+def test_synthetic_data_matches_dashboard_schema():
+    logging.info("Testing synthetic supply chain data generator.")
+    from benchmark_pipeline import generate_supply_chain_data
+    from dashboard_pipeline import clean_data
+    
+    df = generate_supply_chain_data(1000)
+    
+    assert len(df) == 1000
+    assert {"Order_ID", "Order_Date", "Ship_Date", "Sales", "Profit", "Category", "Segment", "City", "Product_Name"}.issubset(df.columns)
+    assert set(df["Category"]) <= {"Furniture", "Office Supplies", "Technology"}
+    assert (clean_data(df.copy())["Lead_Time"] >= 0).all()
+    
+    logging.info("Synthetic data generator passed.")
+
+def test_benchmark_flags_regressions():
+    logging.info("Testing benchmark regression detection.")
+    from benchmark_pipeline import find_regressions
+    
+    history = [
+        {"rows": 1000, "stages": {"cleaning": {"seconds": 1.0}, "kpis": {"seconds": 0.2}}},
+        {"rows": 1000, "stages": {"cleaning": {"seconds": 0.8}, "kpis": {"seconds": 0.2}}},
+        {"rows": 5000, "stages": {"cleaning": {"seconds": 0.1}}}
+    ]
+    result = {"rows": 1000, "stages": {"cleaning": {"seconds": 1.1}, "kpis": {"seconds": 0.21}}}
+    
+    regressions = find_regressions(result, history, threshold=1.25)
+    assert len(regressions) == 1 and "cleaning" in regressions[0]
+    assert find_regressions({"rows": 2000, "stages": {"cleaning": {"seconds": 9.0}}}, history) == []
+    
+    logging.info("Benchmark regression detection passed.")
+
+### 12. Figure Payloads & Figure Cache
+
+def test_binned_histogram_ships_only_bins():
+    logging.info("Testing pre-binned histogram figure.")
+    from dashboard_pipeline import CHART_FIGURES, HISTOGRAM_BINS
+    
+    binned = pd.DataFrame({"Bin": [0, 1, HISTOGRAM_BINS - 1], "Low": [0.0] * 3, "High": [30.0] * 3, "Order_Count": [5, 3, 1]})
+    fig = CHART_FIGURES["inventory_turnover"](binned)
+    
+    assert len(fig.data) == 1 and len(fig.data[0].x) == 3
+    assert list(fig.data[0].x) == [0.5, 1.5, 29.5]
+    assert list(fig.data[0].y) == [5, 3, 1]
+    
+    logging.info("Pre-binned histogram passed.")
+
+def test_figure_cache_reuses_figures_for_unchanged_data():
+    logging.info("Testing figure cache keyed by data fingerprint.")
+    from dashboard_pipeline import FigureCache
+    
+    cache = FigureCache()
+    df = pd.DataFrame({"Segment": ["Consumer", "Corporate"], "Total_Sales": [100.0, 200.0]})
+    
+    first = cache.get("segment_sales", df)
+    assert cache.get("segment_sales", df.copy()) is first
+    assert cache.get("segment_sales", df.assign(Total_Sales=[100.0, 250.0])) is not first
+    assert (cache.hits, cache.misses) == (1, 2)
+    
+    logging.info("Figure cache passed.")
+
+### 13. Forecast Service
+
+def test_forecast_service_fits_off_request_path():
+    logging.info("Testing background forecast service.")
+    pytest.importorskip("statsmodels")
+    from concurrent.futures import ThreadPoolExecutor
+    from forecast_service import ForecastService
+    
+    months = pd.period_range("2012-01", "2014-12", freq="M").astype(str)
+    rollup = pd.concat([
+        pd.DataFrame({"Order_Month": months, "Category": category, "Segment": "All",
+                      "Total_Sales": [100.0 + i + 20 * (i % 12 == 11) for i in range(len(months))],
+                      "Order_Count": [10 + i % 12 for i in range(len(months))]})
+        for category in ["All", "Furniture"]
+    ])
+    
+    service = ForecastService(horizon=3, executor=ThreadPoolExecutor(max_workers=2))
+    assert service.forecast("Total_Sales") is None, "Forecast served before any fit"
+    assert service.update(rollup) == 4
+    service.wait()
+    
+    forecast = service.forecast("Total_Sales", "Furniture", "All")
+    assert list(forecast["Order_Month"]) == ["2015-01", "2015-02", "2015-03"]
+    assert (forecast["Forecast"] >= 0).all()
+    assert service.update(rollup) == 0, "Unchanged months should not be refitted"
+    
+    next_month = rollup.groupby("Category").tail(1).assign(Order_Month="2015-01")
+    assert service.update(pd.concat([rollup, next_month])) == 4, "A new month should refit every series"
+    
+    logging.info("Forecast service passed.")
+
+def test_monthly_rollup_keeps_null_slices_out_of_all():
+    logging.info("Testing monthly rollup labels only rolled-up rows as All.")
+    pytest.importorskip("duckdb")
+    from dashboard_pipeline import MONTHLY_ROLLUP_QUERY
+    from forecast_service import monthly_series
+    from query_backend import DuckDBBackend
+    
+    rows = pd.DataFrame({
+        "Order_ID": ["A", "B", "C"],
+        "Order_Date": pd.to_datetime(["2013-01-05", "2013-01-06", "2013-01-07"]),
+        "Category": ["Furniture", None, "Furniture"],
+        "Segment": ["Consumer", "Consumer", None],
+        "Sales": [100.0, 10.0, 1.0]
+    })
+    rollup = DuckDBBackend({"Cleaneddata": rows}).query(MONTHLY_ROLLUP_QUERY)
+    series = monthly_series(rollup)
+    
+    assert series[("Total_Sales", "all", "all")][1] == [111.0]
+    assert series[("Total_Sales", "all", "consumer")][1] == [110.0]
+    assert series[("Total_Sales", "furniture", "all")][1] == [101.0]
+    assert series[("Order_Count", "all", "all")][1] == [3]
+    
+    logging.info("Monthly rollup passed.")
+
+### 14. Background Scheduler
+
+def test_scheduler_runs_jobs_and_reports_staleness():
+    logging.info("Testing background scheduler.")
+    from scheduler import BackgroundScheduler
+    
+    calls = []
+    scheduler = BackgroundScheduler(tick=0.05)
+    scheduler.add_job("warm", lambda: calls.append("warm"), every=3600)
+    scheduler.add_job("broken", lambda: 1 / 0, at="02:00")
+    scheduler.add_job("later", lambda: calls.append("later"), every=3600, run_at_start=False)
+    with pytest.raises(ValueError):
+        scheduler.add_job("unscheduled", lambda: None)
+    
+    scheduler.start()
+    try:
+        assert scheduler.wait_idle(timeout=5)
+        assert calls == ["warm"], "Only jobs due at start should run"
+        status = scheduler.status().set_index("Job")
+        assert status.loc["warm", "Runs"] == 1
+        assert status.loc["warm", "Staleness (s)"] == 0
+        assert status.loc["broken", "Last Error"] == "division by zero"
+        assert pd.isna(status.loc["broken", "Staleness (s)"]), "A failed run is not a fresh result"
+        
+        scheduler.run_now("later")
+        assert scheduler.wait_idle(timeout=5)
+        assert calls == ["warm", "later"]
+    finally:
+        scheduler.stop()
+    
+    logging.info("Background scheduler passed.")
+
+def test_frame_store_refresh_swaps_entry():
+    logging.info("Testing frame store refresh.")
+    from frame_store import FrameStore
+    
+    store = FrameStore()
+    store.get("default", lambda: pd.DataFrame({"Sales": [1.0]}))
+    store.refresh("default", lambda: pd.DataFrame({"Sales": [2.0]}))
+    frame = store.get("default", lambda: pytest.fail("A refreshed entry should not be reloaded"))
+    assert frame["Sales"].tolist() == [2.0]
+    
+    logging.info("Frame store refresh passed.")
+
+### 15. Column Profiling
+
+def test_column_profiles_match_exact_statistics():
+    logging.info("Testing column profiling engine.")
+    from concurrent.futures import ThreadPoolExecutor
+    import numpy as np
+    from column_profiler import profile_frame, summary_table
+    
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "Sales": rng.gamma(1.2, 200.0, 200_000),
+        "Order_Date": pd.Timestamp("2011-01-01") + pd.to_timedelta(rng.integers(0, 1461, 200_000), unit="D"),
+        "Segment": rng.choice(["Consumer", "Corporate", "Home Office"], 200_000),
+        "Order_ID": [f"ORD-{i:07d}" for i in rng.integers(0, 50_000, 200_000)]
+    })
+    df.loc[::10, "Sales"] = np.nan
+    
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        profiles = profile_frame(df, executor=executor, min_parallel_cells=0)
+    
+    sales = profiles["Sales"]
+    assert sales["count"] == df["Sales"].count() and sales["nulls"] == 20_000
+    assert sales["min"] == df["Sales"].min() and sales["max"] == df["Sales"].max()
+    assert abs(sales["mean"] - df["Sales"].mean()) < 1e-6
+    assert abs(sales["std"] - df["Sales"].std()) < 1e-6
+    for q, value in sales["quantiles"].items():
+        assert abs((df["Sales"].dropna() <= value).mean() - q) < 0.02, f"Quantile {q} is off"
+    assert sales["histogram"]["Order_Count"].sum() == sales["count"]
+    assert abs(sales["distinct"] / df["Sales"].nunique() - 1) < 0.05
+    
+    assert profiles["Order_Date"]["min"] == df["Order_Date"].min()
+    assert profiles["Segment"]["distinct_exact"] and profiles["Segment"]["distinct"] == 3
+    pd.testing.assert_series_equal(
+        profiles["Segment"]["top"].set_index("Segment")["count"],
+        df["Segment"].value_counts().rename_axis("Segment"), check_names=False
+    )
+    
+    # Past the tracked-value capacity the distinct count falls back to the sketch estimate
+    order_ids = profiles["Order_ID"]
+    assert not order_ids["distinct_exact"] and not order_ids["top_exact"]
+    assert abs(order_ids["distinct"] / df["Order_ID"].nunique() - 1) < 0.05
+    
+    assert list(summary_table(profiles)["Column"]) == list(df.columns)
+    logging.info("Column profiling passed.")
+
+def test_column_profile_counts_infinite_values_separately():
+    logging.info("Testing column profiling with infinite values.")
+    import warnings
+    import numpy as np
+    from column_profiler import profile_column, summary_table
+    
+    values = np.array([1.0, np.inf, 3.0, np.nan, -np.inf, 2.0])
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        profile = profile_column("Inventory_Turnover", values)
+        only_infinite = profile_column("Ratio", np.array([np.inf, -np.inf]))
+    
+    assert profile["count"] == 5 and profile["nulls"] == 1 and profile["infinite"] == 2
+    assert profile["min"] == 1.0 and profile["max"] == 3.0
+    assert profile["mean"] == 2.0 and profile["std"] == 1.0
+    assert profile["histogram"]["Order_Count"].sum() == 3
+    assert only_infinite["infinite"] == 2 and only_infinite["min"] is None and only_infinite["histogram"] is None
+    assert summary_table({"Inventory_Turnover": profile})["Infinite"].iloc[0] == 2
+    
+    logging.info("Infinite value profiling passed.")
+
+### 16. Streaming Fetch
+
+def test_duckdb_stream_pages_and_partial_kpis():
+    logging.info("Testing streamed fetch on DuckDB.")
+    pytest.importorskip("duckdb")
+    from benchmark_pipeline import generate_supply_chain_data
+    from kpi_engine import KPIAccumulator, compute_kpis
+    from query_backend import DuckDBBackend
+    
+    backend = DuckDBBackend(tables={"Cleaneddata": generate_supply_chain_data(10_000)})
+    sql = "SELECT * FROM `macro-aurora-434314-h7.Supplychainanalysis.Cleaneddata` ORDER BY Order_ID, Sales"
+    stream = backend.stream(sql, page_size=4096)
+    accumulator = KPIAccumulator()
+    pages = []
+    for page in stream:
+        accumulator.add(page)
+        pages.append(page)
+    
+    assert len(pages) == 3 and stream.rows_read == 10_000
+    pd.testing.assert_frame_equal(pd.concat(pages, ignore_index=True), backend.query(sql))
+    assert accumulator.kpis() == pytest.approx(compute_kpis(backend.query(sql)))
+    
+    stream = backend.stream(sql, page_size=2048)
+    for page in stream:
+        stream.cancel()
+    stream.close()
+    assert stream.rows_read == 2048, "No pages should be read after cancelling"
+    
+    logging.info("DuckDB streamed fetch passed.")
+
+def test_bigquery_stream_cancels_job():
+    logging.info("Testing BigQuery stream cancellation.")
+    from unittest.mock import MagicMock
+    from query_backend import BigQueryBackend
+    
+    client = MagicMock()
+    job = client.query.return_value
+    job.done.side_effect = [False, True]
+    job.result.return_value.total_rows = 4
+    job.result.return_value.to_dataframe_iterable.return_value = iter([pd.DataFrame({"Sales": [1.0, 2.0]}),
+                                                                       pd.DataFrame({"Sales": [3.0, 4.0]})])
+    
+    stream = BigQueryBackend(client).stream("SELECT Sales FROM Cleaneddata")
+    # Waiting polls the job instead of blocking in job.result()
+    assert not stream.wait(0) and stream.wait(0)
+    job.result.assert_not_called()
+    first = next(iter(stream))
+    assert stream.total_rows == 4 and len(first) == 2
+    stream.cancel()
+    assert list(stream) == [], "A cancelled stream should stop yielding pages"
+    job.cancel.assert_called_once()
+    
+    logging.info("BigQuery stream cancellation passed.")
+
+def test_shared_stream_loads_once_and_cancels_when_interrupted():
+    logging.info("Testing shared streamed fetch single-flight and interruption.")
+    pytest.importorskip("duckdb")
+    import threading
+    import time
+    from benchmark_pipeline import generate_supply_chain_data
+    from frame_store import FrameStore
+    from query_backend import DuckDBBackend
+    import dashboard_app
+    
+    backend = DuckDBBackend(tables={"Cleaneddata": generate_supply_chain_data(5_000)})
+    frame_store = FrameStore()
+    sql = "SELECT * FROM Cleaneddata"
+    streams = []
+    stream = backend.stream
+    with patch.object(backend, "stream", side_effect=lambda *args: streams.append(stream(*args)) or streams[-1]), \
+         patch("dashboard_app.get_query_backend", return_value=backend), \
+         patch("dashboard_app.get_frame_store", return_value=frame_store):
+        results = []
+        fetches = [threading.Thread(target=lambda: results.append(
+            dashboard_app.stream_shared_query(sql, None, "all rows", lambda page, stream: time.sleep(0.05)))) for _ in range(3)]
+        for fetch in fetches:
+            fetch.start()
+        for fetch in fetches:
+            fetch.join()
+        assert len(streams) == 1, "Concurrent sessions should share one stream"
+        assert all(len(result) == 5_000 for result in results)
+        
+        # Streamlit stops a run by raising a BaseException from its next call, e.g. a progress update
+        class StopRun(BaseException):
+            pass
+        def stop(page, stream):
+            raise StopRun()
+        with pytest.raises(StopRun):
+            dashboard_app.stream_shared_query(sql + " ORDER BY Order_ID", None, "sorted rows", stop)
+        assert streams[-1].cancelled.is_set(), "An interrupted fetch should cancel its query"
+        assert "sorted rows" not in frame_store.entries and frame_store.key_locks == {}
+    
+    logging.info("Shared streamed fetch passed.")
+
+### 17. DML Preview & Change Log
+
+def test_dml_preview_blocks_large_statements():
+    logging.info("Testing DML preview.")
+    from unittest.mock import MagicMock
+    from dml_guard import ALL_PARTITIONS, preview_dml
+    
+    table = "macro-aurora-434314-h7.Supplychainanalysis.Cleaneddata"
+    client = MagicMock()
+    dry_run, count = MagicMock(total_bytes_processed=5 * 1024 ** 3, statement_type="DELETE"), MagicMock()
+    count.result.return_value = [{"affected_rows": 120, "months": ["2014-02", "2014-01"], "undated_rows": 0}]
+    client.query.side_effect = [dry_run, count]
+    
+    preview = preview_dml(client, "Delete", table, condition="Category = 'Furniture'", max_bytes=1024 ** 3, max_rows=100)
+    assert client.query.call_args_list[0].kwargs["job_config"].dry_run
+    assert "WHERE Category = 'Furniture'" in client.query.call_args_list[1].args[0]
+    assert preview["affected_rows"] == 120 and preview["partitions"] == ["2014-01", "2014-02"]
+    assert len(preview["blocked"]) == 2, "Both the byte and the row limit should block"
+    
+    client.query.side_effect = [MagicMock(total_bytes_processed=0, statement_type="UPDATE"), count]
+    preview = preview_dml(client, "Update", table, set_clause="Order_Date = '2015-01-01'", condition="TRUE")
+    assert preview["partitions"] == [ALL_PARTITIONS] and not preview["blocked"]
+    
+    client.query.side_effect = [MagicMock(total_bytes_processed=0, statement_type="INSERT")]
+    preview = preview_dml(client, "Insert", table, columns="Order_ID, Order_Date, City",
+                          values="'CA-1', '2014-03-05', 'Austin, TX'")
+    assert preview["partitions"] == ["2014-03"] and preview["affected_rows"] == 1
+    
+    # Rows whose month is unknown invalidate every month
+    client.query.side_effect = [MagicMock(total_bytes_processed=0, statement_type="INSERT")]
+    preview = preview_dml(client, "Insert", table, columns="Order_ID, City", values="'CA-2', 'Austin'")
+    assert preview["partitions"] == [ALL_PARTITIONS]
+    undated = MagicMock()
+    undated.result.return_value = [{"affected_rows": 2, "months": [], "undated_rows": 2}]
+    client.query.side_effect = [MagicMock(total_bytes_processed=0, statement_type="DELETE"), undated]
+    preview = preview_dml(client, "Delete", table, condition="Order_Date IS NULL")
+    assert preview["partitions"] == [ALL_PARTITIONS]
+    
+    # A condition that smuggles in a second statement dry-runs as a SCRIPT and is never counted
+    client.query.reset_mock()
+    client.query.side_effect = [MagicMock(total_bytes_processed=0, statement_type="SCRIPT"), count]
+    with pytest.raises(ValueError):
+        preview_dml(client, "Delete", table, condition=f"TRUE; DELETE FROM `{table}` WHERE TRUE")
+    assert client.query.call_count == 1, "Only the dry run may reach BigQuery"
+    
+    logging.info("DML preview passed.")
+
+def test_change_log_invalidates_only_changed_months(tmp_path):
+    logging.info("Testing DML change log.")
+    from benchmark_pipeline import generate_supply_chain_data
+    from dashboard_pipeline import build_fetch_query, query_reads_months
+    from dml_guard import ALL_PARTITIONS, ChangeLog, changed_partitions
+    from kpi_engine import KPIEngine
+    
+    table = "macro-aurora-434314-h7.Supplychainanalysis.Cleaneddata"
+    change_log = ChangeLog(str(tmp_path / "changes.jsonl"))
+    offset = change_log.end()
+    change_log.record(table, "Delete", ["2013-05"], rows=3)
+    change_log.record("macro-aurora-434314-h7.Supplychainanalysis.UserTable", "Insert", [], rows=1)
+    entries, offset = change_log.read(offset)
+    assert len(entries) == 2 and change_log.read(offset) == ([], offset)
+    months = changed_partitions(entries, table)
+    assert months == {"2013-05"}
+    assert changed_partitions([{"table": table, "partitions": [], "rows": 4}], table) == {ALL_PARTITIONS}
+    assert changed_partitions([{"table": table, "partitions": [], "rows": 0}], table) == set()
+    
+    _, _, key_2013 = build_fetch_query(date_range=("2013-01-01", "2013-12-31"))
+    _, _, key_2012 = build_fetch_query(date_range=("2012-01-01", "2012-12-31"))
+    assert query_reads_months(key_2013, months) and not query_reads_months(key_2012, months)
+    assert query_reads_months("SELECT COUNT(*) FROM Cleaneddata", months)
+    
+    df = generate_supply_chain_data(5_000)
+    engine = KPIEngine(df)
+    changed = df[~((df["Order_Date"] >= "2013-05-01") & (df["Order_Date"] < "2013-05-15"))]
+    engine.replace_months(months, changed[changed["Order_Date"].dt.strftime("%Y-%m") == "2013-05"])
+    expected = KPIEngine(changed)
+    for date_range in [None, ("2013-04-10", "2013-05-20")]:
+        assert engine.metrics(date_range) == pytest.approx(expected.metrics(date_range))
+    
+    logging.info("DML change log passed.")